@@ -48,7 +48,7 @@ async def all_examples(api_key, your_learning_storage):
         success, err = await govee.set_color(cache_device, (red, green, blue))
 
         ### rate limiting:
-        # set requests left before the rate limiter stops us
+        # set requests kept in reserve, the rate limiter paces our requests to keep them
         govee.rate_limit_on = 5  # 5 requests is the default
         current_rate_limit_on = govee.rate_limit_on
         # see also these properties:
@@ -101,8 +101,4 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     # going async ...
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(all_examples(args.api_key, your_learning_storage))
-    finally:
-        loop.close()
+    asyncio.run(all_examples(args.api_key, your_learning_storage))
@@ -6,32 +6,46 @@ import logging
 import os
 from typing import Dict
 
-import bios
-import dacite
-from dataclasses import asdict
+from dataclasses import fields
 from govee_api_laggat import Govee, GoveeAbstractLearningStorage, GoveeLearnedInfo
 
 _LOGGER = logging.getLogger(__name__)
+# GoveeLearnedInfo is flat, read its fields directly instead of deep copying with asdict()
+_LEARNED_INFO_FIELDS = tuple(f.name for f in fields(GoveeLearnedInfo))
+_DEFAULT_PATH = os.path.expanduser("~/.govee_learning.yaml")
+
+
+def _import_yaml():
+    """Import PyYAML on first use, it is an optional dependency."""
+    try:
+        import yaml
+    except ImportError as ex:
+        raise ImportError(
+            "YamlLearningStorage needs PyYAML, install it with: pip install govee_api_laggat[yaml]"
+        ) from ex
+    return yaml
 
 
 class YamlLearningStorage(GoveeAbstractLearningStorage):
     """Storage for govee_api_laggat to Save/Restore learned informations for lamps."""
 
     def __init__(self, *args, **kwargs):
-        """If you override __init__, call super."""
-        self._filename = os.path.expanduser("~/.govee_learning.yaml")
+        """If you override __init__, call super. Pass filename to store elsewhere."""
+        self._filename = kwargs.pop("filename", _DEFAULT_PATH)
         super().__init__(*args, **kwargs)
 
     async def read(self) -> Dict[str, GoveeLearnedInfo]:
         """get the last saved learning information from disk, database, ... and return it."""
         learned_info = {}
         try:
-            device_dict = bios.read(self._filename)
+            yaml = _import_yaml()
+            # use the libyaml bindings when PyYAML was built with them
+            loader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+            with open(self._filename, "rb") as stream:
+                device_dict = yaml.load(stream, Loader=loader)
             learned_info = {
-                dacite.from_dict(
-                    data_class=GoveeLearnedInfo, data=device_dict[device_str]
-                )
-                for device_str in device_dict
+                device_str: GoveeLearnedInfo(**info)
+                for device_str, info in device_dict.items()
             }
             _LOGGER.info(
                 "Loaded learning information from %s.",
@@ -47,8 +61,14 @@ class YamlLearningStorage(GoveeAbstractLearningStorage):
 
     async def write(self, learned_info: Dict[str, GoveeLearnedInfo]):
         """Save this dictionary to disk."""
-        leaned_dict = {device: asdict(learned_info[device]) for device in learned_info}
-        bios.write(self._filename, leaned_dict)
+        leaned_dict = {
+            device: {name: getattr(info, name) for name in _LEARNED_INFO_FIELDS}
+            for device, info in learned_info.items()
+        }
+        yaml = _import_yaml()
+        dumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+        with open(self._filename, "w") as stream:
+            yaml.dump(leaned_dict, stream, Dumper=dumper)
         _LOGGER.info(
             "Stored learning information to %s.",
             self._filename,
@@ -81,10 +101,4 @@ if __name__ == "__main__":
             print(f"See {storage._filename} for leaned configuration.")
 
     # going async ...
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(
-            some_light_commands(args.api_key, YamlLearningStorage())
-        )
-    finally:
-        loop.close()
+    asyncio.run(some_light_commands(args.api_key, YamlLearningStorage()))
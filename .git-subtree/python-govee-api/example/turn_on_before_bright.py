@@ -25,8 +25,4 @@ if __name__ == "__main__":
     args = parser.parse_args()
 
     # going async ...
-    loop = asyncio.get_event_loop()
-    try:
-        loop.run_until_complete(foo(args.api_key))
-    finally:
-        loop.close()
+    asyncio.run(foo(args.api_key))
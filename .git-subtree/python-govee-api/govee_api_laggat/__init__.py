@@ -5,6 +5,7 @@ from .__version__ import VERSION
 from .govee_api_laggat import (
     Govee,
     GoveeDevice,
+    GoveeRateLimit,
     GoveeSource,
 )
 from .govee_errors import (
@@ -1,14 +1,27 @@
 import aiohttp
 import asyncio
 import certifi
+from collections import defaultdict
 from contextlib import asynccontextmanager
 import logging
 import math
 import ssl
-from typing import Any, List, Tuple, Union
-
-from govee_api_laggat.govee_dtos import GoveeDevice, GoveeSource
-from govee_api_laggat.govee_errors import GoveeError
+import sys
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+
+try:
+    # optional, faster (de)serialization of API payloads
+    import orjson
+except ImportError:
+    orjson = None
+
+from govee_api_laggat.govee_dtos import GoveeDevice, GoveeRateLimit, GoveeSource
+from govee_api_laggat.govee_errors import (
+    ERR_RATE_LIMIT_ABOVE_LIMIT,
+    ERR_RATE_LIMIT_BELOW_ONE,
+    GoveeError,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -16,13 +29,30 @@ _API_BASE_URL = "https://developer-api.govee.com"
 _API_DEVICES = _API_BASE_URL + "/v1/devices"
 _API_DEVICES_CONTROL = _API_BASE_URL + "/v1/devices/control"
 _API_DEVICES_STATE = _API_BASE_URL + "/v1/devices/state"
+# state properties we understand from the devices/state endpoint
+_KNOWN_STATE_PROPERTIES = frozenset(
+    ["online", "powerState", "brightness", "color", "colorTemInKelvin"]
+)
+# govee returns booleans, 'true'/'false' strings or 'on'/'off' for state flags
+_BOOL_MAP = {
+    True: True,
+    False: False,
+    "true": True,
+    "false": False,
+    "on": True,
+    "off": False,
+}
+# error for a successful response without a parseable body
+_ERR_INVALID_JSON = "API returned OK but no valid JSON."
 # API rate limit header keys
-_RATELIMIT_TOTAL = "Rate-Limit-Total"  # The maximum number of requests you're permitted to make per minute.
-_RATELIMIT_REMAINING = "Rate-Limit-Remaining"  # The number of requests remaining in the current rate limit window.
-_RATELIMIT_RESET = "Rate-Limit-Reset"  # The time at which the current rate limit window resets in UTC epoch seconds.
+_RATELIMIT_TOTAL = sys.intern("Rate-Limit-Total")  # The maximum number of requests you're permitted to make per minute.
+_RATELIMIT_REMAINING = sys.intern("Rate-Limit-Remaining")  # The number of requests remaining in the current rate limit window.
+_RATELIMIT_RESET = sys.intern("Rate-Limit-Reset")  # The time at which the current rate limit window resets in UTC epoch seconds.
 _RATELIMIT_RESET_MAX_SECONDS = (
     180  # The maximum time in seconds to wait for a rate limit reset
 )
+_RATELIMIT_WINDOW_SECONDS = 60  # rate limit window assumed until the API tells us
+_RATELIMIT_BURST = 5  # requests we may send at once before pacing kicks in
 
 # return state from hisory for n seconds after controlling the device
 DELAY_GET_FOLLOWING_SET_SECONDS = 2
@@ -32,20 +62,133 @@ DELAY_SET_FOLLOWING_SET_SECONDS = 1
 # regularly discover devices
 SCHEDULE_GET_DEVICES_SECONDS = 100
 
+# connection pool to the API, keep idle connections longer than our poll interval.
+# all requests go to one host, so only the per host limit matters and it has
+# to allow the concurrent state requests.
+CONNECTION_LIMIT_PER_HOST = max(8, _RATELIMIT_BURST)
+CONNECTION_KEEPALIVE_SECONDS = 120
+CONNECTION_DNS_CACHE_SECONDS = 300
+
+
+def _orjson_serialize(obj) -> str:
+    """Serialize request bodies with orjson, aiohttp expects a str."""
+    return orjson.dumps(obj).decode()
+
+
+async def _response_json(response):
+    """Parse the JSON body of a response, using orjson when it is installed.
+
+    returns: the parsed body, None for an empty or invalid body
+    """
+    try:
+        if not orjson:
+            return await response.json()
+        body = await response.read()
+        return orjson.loads(body) if body else None
+    except ValueError as ex:
+        _LOGGER.warning(f"API returned invalid JSON: {ex}")
+        return None
+
+
+def _parse_rate_limit_headers(headers) -> Union[Tuple[int, int, float], None]:
+    """Parse total, remaining and reset from the rate limit headers, None if absent."""
+    try:
+        total = headers[_RATELIMIT_TOTAL]
+        remaining = headers[_RATELIMIT_REMAINING]
+        reset = headers[_RATELIMIT_RESET]
+    except KeyError:
+        return None
+    return int(total), int(remaining), float(reset)
+
+
+class _TokenBucket(object):
+    """Token bucket pacing requests to the API rate limit.
+
+    Tokens refill continuously at `rate` per second up to `capacity`.
+    Each request takes a token, when none is left the caller sleeps
+    for the deficit instead of waiting for the whole rate limit window.
+    """
+
+    def __init__(self, capacity: float, rate: float):
+        """Init a full bucket."""
+        self.capacity = capacity
+        self.rate = rate
+        self.tokens = capacity
+        self.last_refill = time.monotonic()
+
+    def refill(self):
+        """Add tokens for the time passed since the last refill."""
+        now = time.monotonic()
+        self.tokens = min(
+            self.capacity, self.tokens + (now - self.last_refill) * self.rate
+        )
+        self.last_refill = now
+
+    def reserve(self) -> float:
+        """Take a token, return the seconds to wait until it is available."""
+        self.refill()
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0
+        return -self.tokens / self.rate
+
+    def drain(self):
+        """Drop all tokens, the next request waits for one to refill."""
+        self.refill()
+        self.tokens = min(self.tokens, 0)
+
+    def recalibrate(self, available: int, window_seconds: float):
+        """Spread the available requests over the rest of the rate limit window.
+
+        When nothing is available the next token arrives when the window resets.
+        Requests that already reserved a token and wait for it stay reserved.
+        """
+        self.refill()
+        if window_seconds <= 0:
+            window_seconds = _RATELIMIT_WINDOW_SECONDS
+        waiting = min(self.tokens, 0)
+        self.rate = max(available, 1) / window_seconds
+        self.tokens = min(self.capacity, max(available, 0)) + waiting
+
+
+class _Superseded(Exception):
+    """A newer call with the same command replaced a call waiting for the device."""
+
+    def __init__(self, newer: asyncio.Future):
+        super().__init__()
+        # outcome of the newer call, the replaced call returns it
+        self.newer = newer
+
 
 class GoveeApi(object):
     """Govee API client."""
 
     async def __aenter__(self):
         """Async context manager enter."""
-        ssl_context = ssl.create_default_context(cafile=certifi.where())
-        conn = aiohttp.TCPConnector(ssl=ssl_context)
-        self._session = aiohttp.ClientSession(connector=conn)
+        if not self._session:
+            ssl_context = ssl.create_default_context(cafile=certifi.where())
+            conn = aiohttp.TCPConnector(
+                ssl=ssl_context,
+                limit=0,
+                limit_per_host=CONNECTION_LIMIT_PER_HOST,
+                keepalive_timeout=CONNECTION_KEEPALIVE_SECONDS,
+                ttl_dns_cache=CONNECTION_DNS_CACHE_SECONDS,
+            )
+            if orjson:
+                self._session = aiohttp.ClientSession(
+                    connector=conn, json_serialize=_orjson_serialize
+                )
+            else:
+                self._session = aiohttp.ClientSession(connector=conn)
+            self._owns_session = True
+        # concurrent state requests, the rate limiter allows this burst
+        self._state_semaphore = asyncio.Semaphore(_RATELIMIT_BURST)
         return self
 
     async def __aexit__(self, *err):
         """Async context manager exit."""
-        if self._session:
+        # a session passed in by the caller is closed by the caller
+        if self._session and self._owns_session:
             await self._session.close()
         self._session = None
 
@@ -53,23 +196,38 @@ class GoveeApi(object):
         self,
         govee,
         api_key: str,
+        *,
+        session: Optional[aiohttp.ClientSession] = None,
     ):
-        """Init with an API_KEY and storage for learned values."""
+        """Init with an API_KEY and an optional shared aiohttp session."""
         self._govee = govee
         self._api_key = api_key
+        self._session = session
+        self._owns_session = False
+        self._device_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # outcome of the latest call per (device, command), older waiting calls
+        # are not sent
+        self._control_calls: Dict[Tuple[str, str], asyncio.Future] = {}
+        # rate limits assumed before the API reports them
         self._rate_limit_on = 5  # safe available call count for multiple processes
         self._limit = 100
         self._limit_remaining = 100
         self._limit_reset = 0
+        self._limit_reset_monotonic = 0
+        self._bucket = _TokenBucket(
+            _RATELIMIT_BURST, self._limit / _RATELIMIT_WINDOW_SECONDS
+        )
 
     @classmethod
     async def create(
         cls,
         govee,
         api_key: str,
+        *,
+        session: Optional[aiohttp.ClientSession] = None,
     ):
         """Use create method if you want to use this Client without an async context manager."""
-        self = GoveeApi(govee, api_key)
+        self = GoveeApi(govee, api_key, session=session)
         await self.__aenter__()
         return self
 
@@ -115,13 +273,13 @@ class GoveeApi(object):
         await self.rate_limit_delay()
         try:
             async with request_lambda() as response:
-                self._govee._set_online(True)  # we got something, so we are online
+                await self._govee._set_online(True)  # we got something, so we are online
                 self._track_rate_limit(response)
                 # return the async content manager response
                 yield response
         except aiohttp.ClientError as ex:
             # we are offline
-            self._govee._set_online(False)
+            await self._govee._set_online(False)
             err = "error from aiohttp: %s" % repr(ex)
         except Exception as ex:
             err = "unknown error: %s" % repr(ex)
@@ -145,44 +303,59 @@ class GoveeApi(object):
             _LOGGER.warning(
                 "Rate limit exceeded, check if other devices also utilize the govee API"
             )
+            # no burst until the API grants requests again, even without headers
+            self._bucket.drain()
         limit_unknown = True
-        if (
-            _RATELIMIT_TOTAL in response.headers
-            and _RATELIMIT_REMAINING in response.headers
-            and _RATELIMIT_RESET in response.headers
-        ):
-            try:
-                self._limit = int(response.headers[_RATELIMIT_TOTAL])
-                self._limit_remaining = int(response.headers[_RATELIMIT_REMAINING])
+        try:
+            rate_limit = _parse_rate_limit_headers(response.headers)
+            if rate_limit:
+                self._limit, self._limit_remaining, limit_reset_api = rate_limit
                 # reset rate limiting with maximum
-                limit_reset = self._govee._utcnow() + _RATELIMIT_RESET_MAX_SECONDS
-                limit_reset_api = float(response.headers[_RATELIMIT_RESET])
+                now = time.time()
+                limit_reset = now + _RATELIMIT_RESET_MAX_SECONDS
                 if limit_reset_api < limit_reset:
                     # api returns valid values for rate limit reset seconds
                     limit_reset = limit_reset_api
                 self._limit_reset = limit_reset
+                # the API sends wall clock time, count down on the monotonic clock
+                self._limit_reset_monotonic = time.monotonic() + limit_reset - now
+                self._bucket.recalibrate(
+                    self._limit_remaining - self._rate_limit_on,
+                    self.rate_limit_reset_seconds,
+                )
                 _LOGGER.debug(
                     f"Rate limit total: {self._limit}, " +
                     f"remaining: {self._limit_remaining} in {self.rate_limit_reset_seconds} seconds"
                 )
                 limit_unknown = False
-            except Exception as ex:
-                _LOGGER.warning(f"Error trying to get rate limits: {ex}")
+        except Exception as ex:
+            _LOGGER.warning(f"Error trying to get rate limits: {ex}")
         if limit_unknown:
             self._limit_remaining -= 1
 
     async def rate_limit_delay(self):
-        """Delay a call when rate limiting is active."""
-        # do we have requests left?
-        if self.rate_limit_remaining <= self.rate_limit_on:
-            # do we need to sleep?
-            sleep_sec = self.rate_limit_reset_seconds
-            if sleep_sec > 0:
+        """Delay a call until the rate limiter grants a request."""
+        sleep_sec = self._bucket.reserve()
+        if sleep_sec > 0:
+            if self._limit_remaining <= self._rate_limit_on:
                 _LOGGER.warning(
                     f"Rate limiting active, {self._limit_remaining} of {self._limit} remaining, " +
                     f"sleeping for {sleep_sec}s."
                 )
-                await asyncio.sleep(sleep_sec)
+            else:
+                _LOGGER.debug(f"Rate limiter pacing request, sleeping for {sleep_sec}s.")
+            await asyncio.sleep(sleep_sec)
+
+    @property
+    def rate_limit_snapshot(self) -> GoveeRateLimit:
+        """All rate limit values read at once."""
+        return GoveeRateLimit(
+            total=self._limit,
+            remaining=self._limit_remaining,
+            reset=self._limit_reset,
+            reset_seconds=self._limit_reset_monotonic - time.monotonic(),
+            on=self._rate_limit_on,
+        )
 
     @property
     def rate_limit_total(self):
@@ -202,11 +375,11 @@ class GoveeApi(object):
     @property
     def rate_limit_reset_seconds(self):
         """Seconds until the rate limit will be reset."""
-        return self._limit_reset - self._govee._utcnow()
+        return self._limit_reset_monotonic - time.monotonic()
 
     @property
     def rate_limit_on(self):
-        """Remaining calls that trigger rate limiting.
+        """Remaining calls kept in reserve, the rate limiter paces requests to keep them.
 
         Defaults to 5, which means there is some room for other clients.
         """
@@ -216,11 +389,9 @@ class GoveeApi(object):
     def rate_limit_on(self, val):
         """Set the remaining calls that trigger rate limiting."""
         if val > self._limit:
-            raise GoveeError(
-                f"Rate limiter threshold {val} must be below {self._limit}"
-            )
+            raise GoveeError(ERR_RATE_LIMIT_ABOVE_LIMIT, val, self._limit)
         if val < 1:
-            raise GoveeError(f"Rate limiter threshold {val} must be above 1")
+            raise GoveeError(ERR_RATE_LIMIT_BELOW_ONE, val)
         self._rate_limit_on = val
 
     async def check_connection(self) -> bool:
@@ -237,8 +408,10 @@ class GoveeApi(object):
 
         async with self._api_get(url=_API_DEVICES) as response:
             if response.status == 200:
-                result = await response.json()
-                if (
+                result = await _response_json(response)
+                if result is None:
+                    err = _ERR_INVALID_JSON
+                elif (
                     "data" in result
                     and "devices" in result["data"]
                     and isinstance(result["data"]["devices"], list)
@@ -248,8 +421,10 @@ class GoveeApi(object):
 
                     for item in result["data"]["devices"]:
                         device_str = item["device"]
-                        if device_str in self._govee._devices.keys():
-                            # already in list
+                        known_device = self._govee._devices_dict.get(device_str)
+                        if known_device:
+                            # keep the instance and its state, refresh device info
+                            known_device.update_from_api_json(item)
                             continue
                         model_str = item["model"]
                         is_retrievable = item["retrievable"]
@@ -280,17 +455,8 @@ class GoveeApi(object):
                             config_offline_is_off = learning_info.config_offline_is_off
 
                         # create device DTO
-                        self._govee._devices[device_str] = GoveeDevice(
-                            device=device_str,
-                            model=model_str,
-                            device_name=item["deviceName"],
-                            controllable=item["controllable"],
-                            retrievable=is_retrievable,
-                            support_cmds=item["supportCmds"],
-                            support_turn="turn" in item["supportCmds"],
-                            support_brightness="brightness" in item["supportCmds"],
-                            support_color="color" in item["supportCmds"],
-                            support_color_tem="colorTem" in item["supportCmds"],
+                        device = GoveeDevice.from_api_json(
+                            item,
                             # defaults for state
                             online=True,
                             power_state=False,
@@ -307,8 +473,9 @@ class GoveeApi(object):
                             before_set_brightness_turn_on=before_set_brightness_turn_on,
                             config_offline_is_off=config_offline_is_off,
                         )
+                        self._govee._add_device(device)
                         # inform client on new devices
-                        self._govee.events.new_device(self._govee._devices[device_str])
+                        await self._govee.events.new_device.fire(device)
 
                 else:
                     _LOGGER.info(
@@ -336,72 +503,88 @@ class GoveeApi(object):
             err = f"Invalid device {device_str}, {device}"
         else:
             command = "turn"
-            params = onOff
-            result, err = await self._control(device, command, params)
-            success = False
-            if not err:
-                success = self._is_success_result_message(result)
-                if success:
-                    self._govee._update_state(
-                        GoveeSource.HISTORY, device, "power_state", onOff == "on"
-                    )
+
+            async def send(call):
+                result, err = await self._control(device, command, onOff, call)
+                success = False
+                if not err:
+                    success = self._is_success_result_message(result)
+                    if success:
+                        self._govee._update_state(
+                            GoveeSource.HISTORY, device, "power_state", onOff == "on"
+                        )
+                return success, err
+
+            success, err = await self._latest_call(device, command, send)
         return success, err
 
     async def set_brightness(
         self, device: Union[str, GoveeDevice], brightness: int
     ) -> Tuple[bool, str]:
         """Set brightness to 0-254."""
+        if not 0 <= brightness <= 254:
+            # validate before any work, the message is built only on failure
+            return (
+                False,
+                f"set_brightness: invalid value {brightness}, allowed range 0 .. 254",
+            )
         success = False
         err = None
         device_str, device = self._govee._get_device(device)
         if not device:
             err = f"Invalid device {device_str}, {device}"
-        elif brightness < 0 or brightness > 254:
-            err = f"set_brightness: invalid value {brightness}, allowed range 0 .. 254"
         else:
             if brightness > 0 and device.before_set_brightness_turn_on:
                 await self._govee.turn_on(device)
                 # API doesn't work if we don't sleep
                 await asyncio.sleep(1)
-            # set brightness as 0..254
-            brightness_set = brightness
-            brightness_result = brightness_set
-            brightness_set_100 = 0
-            if brightness_set > 0:
-                brightness_set_100 = max(1, math.floor(brightness * 100 / 254))
-            brightness_result_100 = math.ceil(brightness_set_100 * 254 / 100)
-            if device.learned_set_brightness_max == 100:
-                # set brightness as 0..100
-                brightness_set = brightness_set_100
-                brightness_result = brightness_result_100
             command = "brightness"
-            result, err = await self._control(device, command, brightness_set)
-            if err:
-                # try again with 0-100 range
-                if "API-Error 400" in err:  # Unsupported Cmd Value
-                    # set brightness as 0..100 as 0..254 didn't work
+
+            async def send(call):
+                # set brightness as 0..254
+                brightness_set = brightness
+                brightness_result = brightness_set
+                brightness_set_100 = 0
+                if brightness_set > 0:
+                    brightness_set_100 = max(1, math.floor(brightness * 100 / 254))
+                brightness_result_100 = math.ceil(brightness_set_100 * 254 / 100)
+                if device.learned_set_brightness_max == 100:
+                    # set brightness as 0..100
                     brightness_set = brightness_set_100
                     brightness_result = brightness_result_100
-                    result, err = await self._control(device, command, brightness_set)
-                    if not err:
-                        device.learned_set_brightness_max = 100
-                        await self._govee._learn(device)
-            elif brightness_set > 100:
-                device.learned_set_brightness_max = 254
-                await self._govee._learn(device)
-
-            if not err:
-                success = self._is_success_result_message(result)
-                if success:
-                    self._govee._update_state(
-                        GoveeSource.HISTORY, device, "brightness", brightness_result
-                    )
-                    self._govee._update_state(
-                        GoveeSource.HISTORY,
-                        device,
-                        "power_state",
-                        brightness_result > 0,
-                    )
+                result, err = await self._control(device, command, brightness_set, call)
+                if err:
+                    # try again with 0-100 range
+                    if "API-Error 400" in err:  # Unsupported Cmd Value
+                        # set brightness as 0..100 as 0..254 didn't work
+                        brightness_set = brightness_set_100
+                        brightness_result = brightness_result_100
+                        result, err = await self._control(
+                            device, command, brightness_set, call
+                        )
+                        if not err:
+                            device.learned_set_brightness_max = 100
+                            await self._govee._learn(device)
+                elif brightness_set > 100:
+                    device.learned_set_brightness_max = 254
+                    await self._govee._learn(device)
+
+                success = False
+                if not err:
+                    success = self._is_success_result_message(result)
+                    if success:
+                        self._govee._update_state(
+                            GoveeSource.HISTORY, device, "brightness", brightness_result
+                        )
+                        self._govee._update_state(
+                            GoveeSource.HISTORY,
+                            device,
+                            "power_state",
+                            brightness_result > 0,
+                        )
+                return success, err
+
+            success, err = await self._latest_call(device, command, send)
         return success, err
 
     async def set_color_temp(
@@ -417,13 +600,19 @@ class GoveeApi(object):
             err = f"set_color_temp: invalid value {color_temp}, allowed range 2000-9000"
         else:
             command = "colorTem"
-            result, err = await self._control(device, command, color_temp)
-            if not err:
-                success = self._is_success_result_message(result)
-                if success:
-                    self._govee._update_state(
-                        GoveeSource.HISTORY, device, "color_temp", color_temp
-                    )
+
+            async def send(call):
+                result, err = await self._control(device, command, color_temp, call)
+                success = False
+                if not err:
+                    success = self._is_success_result_message(result)
+                    if success:
+                        self._govee._update_state(
+                            GoveeSource.HISTORY, device, "color_temp", color_temp
+                        )
+                return success, err
+
+            success, err = await self._latest_call(device, command, send)
         return success, err
 
     async def set_color(
@@ -452,25 +641,67 @@ class GoveeApi(object):
             else:
                 command = "color"
                 command_color = {"r": red, "g": green, "b": blue}
-                result, err = await self._control(device, command, command_color)
-                if not err:
-                    success = self._is_success_result_message(result)
-                    if success:
-                        self._govee._update_state(
-                            GoveeSource.HISTORY, device, "color", color
-                        )
+
+                async def send(call):
+                    result, err = await self._control(
+                        device, command, command_color, call
+                    )
+                    success = False
+                    if not err:
+                        success = self._is_success_result_message(result)
+                        if success:
+                            self._govee._update_state(
+                                GoveeSource.HISTORY, device, "color", color
+                            )
+                    return success, err
+
+                success, err = await self._latest_call(device, command, send)
         return success, err
 
-    def _get_lock_seconds(self, utcSeconds: int) -> int:
-        """Get seconds to wait."""
-        seconds_lock = utcSeconds - self._govee._utcnow()
+    async def _latest_call(
+        self,
+        device: GoveeDevice,
+        command: str,
+        send: Callable[[asyncio.Future], Awaitable[Tuple[bool, str]]],
+    ) -> Tuple[bool, str]:
+        """Run a command as the latest call of it on the device.
+
+        send(call) passes call on to _control. A call still waiting for the device
+        when a newer call with the same command starts is not sent, it waits for
+        the newer call and returns its outcome.
+        """
+        call = asyncio.get_running_loop().create_future()
+        self._control_calls[(device.device, command)] = call
+        try:
+            try:
+                outcome = await send(call)
+            except _Superseded as superseded:
+                outcome = await asyncio.shield(superseded.newer)
+        except BaseException:
+            # calls replaced by this one end the same way
+            call.cancel()
+            raise
+        call.set_result(outcome)
+        return outcome
+
+    def _get_lock_seconds(self, until: float) -> float:
+        """Get seconds to wait until the monotonic clock reaches until."""
+        seconds_lock = until - time.monotonic()
         seconds_lock = max(seconds_lock, 0)
         return seconds_lock
 
     async def _control(
-        self, device: Union[str, GoveeDevice], command: str, params: Any
+        self,
+        device: Union[str, GoveeDevice],
+        command: str,
+        params: Any,
+        call: Optional[asyncio.Future] = None,
     ) -> Tuple[Any, str]:
-        """Control led strips and bulbs."""
+        """Control led strips and bulbs.
+
+        With the call of _latest_call, raises _Superseded instead of sending when a
+        newer call with the same command started while this one waited.
+        """
         device_str, device = self._govee._get_device(device)
         cmd = {"name": command, "value": params}
         _LOGGER.debug(f"control {device_str}: {cmd}")
@@ -487,29 +718,38 @@ class GoveeApi(object):
             )
             _LOGGER.warning(f"control {device_str} not possible: {err}")
         else:
-            while True:
-                seconds_locked = self._get_lock_seconds(device.lock_set_until)
-                if not seconds_locked:
-                    break
-                _LOGGER.debug(
-                    f"control {device_str} is locked for {seconds_locked} seconds. Command waiting: {cmd}"
-                )
-                await asyncio.sleep(seconds_locked)
-            json = {"device": device.device, "model": device.model, "cmd": cmd}
-            await self.rate_limit_delay()
-            async with self._api_put(url=_API_DEVICES_CONTROL, json=json) as response:
-                if response.status == 200:
-                    device.lock_set_until = (
-                        self._govee._utcnow() + DELAY_SET_FOLLOWING_SET_SECONDS
+            # commands to one device wait for each other, other devices are not blocked
+            async with self._device_locks[device.device]:
+                latest = self._control_calls.get((device.device, command))
+                if call is not None and latest is not call:
+                    _LOGGER.debug(f"control {device_str} superseded: {cmd}")
+                    raise _Superseded(latest)
+                while True:
+                    seconds_locked = self._get_lock_seconds(device.lock_set_until)
+                    if not seconds_locked:
+                        break
+                    _LOGGER.debug(
+                        f"control {device_str} is locked for {seconds_locked} seconds. Command waiting: {cmd}"
                     )
-                    device.lock_get_until = (
-                        self._govee._utcnow() + DELAY_GET_FOLLOWING_SET_SECONDS
-                    )
-                    result = await response.json()
-                else:
-                    text = await response.text()
-                    err = f"API-Error {response.status} on command {cmd}: {text} for device {device}"
-                    _LOGGER.warning(f"control {device_str} failed: {err}")
+                    await asyncio.sleep(seconds_locked)
+                json = {**device._api_params, "cmd": cmd}
+                async with self._api_put(
+                    url=_API_DEVICES_CONTROL, json=json
+                ) as response:
+                    if response.status == 200:
+                        device.lock_set_until = (
+                            time.monotonic() + DELAY_SET_FOLLOWING_SET_SECONDS
+                        )
+                        device.lock_get_until = (
+                            time.monotonic() + DELAY_GET_FOLLOWING_SET_SECONDS
+                        )
+                        result = await _response_json(response)
+                        if result is None:
+                            err = _ERR_INVALID_JSON
+                    else:
+                        text = await response.text()
+                        err = f"API-Error {response.status} on command {cmd}: {text} for device {device}"
+                        _LOGGER.warning(f"control {device_str} failed: {err}")
         return result, err
 
     async def _get_device_state(
@@ -540,38 +780,32 @@ class GoveeApi(object):
             )
 
         else:
-            params = {"device": device.device, "model": device.model}
+            params = device._api_params
             async with self._api_get(url=_API_DEVICES_STATE, params=params) as response:
                 if response.status == 200:
-                    json_obj = await response.json()
+                    json_obj = await _response_json(response)
                     if not json_obj:
-                        err = "API returned OK but no valid JSON."
+                        err = _ERR_INVALID_JSON
                         result = device
                     else:
-                        prop_online = False
-                        prop_power_state = False
-                        prop_brightness = False
-                        prop_color = (0, 0, 0)
-                        prop_color_temp = 0
-
-                        for prop in json_obj["data"]["properties"]:
-                            # somehow these are all dicts with one element
-                            if "online" in prop:
-                                prop_online = prop["online"] in [True, "true"]
-                            elif "powerState" in prop:
-                                prop_power_state = prop["powerState"] == "on"
-                            elif "brightness" in prop:
-                                prop_brightness = prop["brightness"]
-                            elif "color" in prop:
-                                prop_color = (
-                                    prop["color"]["r"],
-                                    prop["color"]["g"],
-                                    prop["color"]["b"],
-                                )
-                            elif "colorTemInKelvin" in prop:
-                                prop_color_temp = prop["colorTemInKelvin"]
-                            else:
-                                _LOGGER.debug(f"unknown state property '{prop}'")
+                        # the API returns a list of single-element dicts,
+                        # flatten them once so each property is a key lookup
+                        props = {
+                            key: value
+                            for prop in json_obj["data"]["properties"]
+                            for key, value in prop.items()
+                        }
+                        prop_online = _BOOL_MAP.get(props.get("online"), False)
+                        prop_power_state = _BOOL_MAP.get(props.get("powerState"), False)
+                        prop_brightness = props.get("brightness", False)
+                        color = props.get("color")
+                        prop_color = (
+                            (color["r"], color["g"], color["b"]) if color else (0, 0, 0)
+                        )
+                        prop_color_temp = props.get("colorTemInKelvin", 0)
+                        unknown = props.keys() - _KNOWN_STATE_PROPERTIES
+                        if unknown:
+                            _LOGGER.debug(f"unknown state properties {sorted(unknown)}")
 
                         if not prop_online and (
                             self._govee.config_offline_is_off is not None
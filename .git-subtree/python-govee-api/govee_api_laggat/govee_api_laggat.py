@@ -2,15 +2,23 @@
 
 import asyncio
 import logging
-from datetime import datetime
-from events import Events
+import time
 from typing import Dict, List, Optional, Tuple, Union
 
+import aiohttp
+
 from govee_api_laggat.__version__ import VERSION
 from govee_api_laggat.api import GoveeApi
 from govee_api_laggat.ble import GoveeBle
-from govee_api_laggat.govee_dtos import GoveeDevice, GoveeSource
-from govee_api_laggat.govee_errors import GoveeDeviceNotFound, GoveeError
+from govee_api_laggat.govee_dtos import GoveeDevice, GoveeRateLimit, GoveeSource
+from govee_api_laggat.govee_errors import (
+    ERR_IGNORE_FIELD,
+    ERR_IGNORE_FORMAT,
+    ERR_IGNORE_SOURCE,
+    GoveeDeviceNotFound,
+    GoveeError,
+)
+from govee_api_laggat.govee_events import GoveeEvents
 from govee_api_laggat.learning_storage import (
     GoveeAbstractLearningStorage,
     GoveeLearnedInfo,
@@ -20,6 +28,12 @@ _LOGGER = logging.getLogger(__name__)
 
 ERR_MESSAGE_NO_ACTIVE_IMPL = "No implementation is available for that action."
 SCHEDULE_GET_DEVICES_SECONDS = 300
+# sources in the ignore_device_attributes string
+_IGNORE_SOURCES = {
+    "api": GoveeSource.API,
+    "history": GoveeSource.HISTORY,
+    "ble": GoveeSource.BLE,
+}
 
 
 class Govee(object):
@@ -27,18 +41,16 @@ class Govee(object):
 
     async def __aenter__(self, *args, **kwargs):
         """Async context manager enter."""
-        # self._session = aiohttp.ClientSession()
         await self._scheduler_start()
         if self._api_key:
-            self._api = await GoveeApi.create(self, self._api_key)
+            self._api = await GoveeApi.create(
+                self, self._api_key, session=self._session
+            )
         return self
 
     async def __aexit__(self, *err):
         """Async context manager exit."""
         await self._scheduler_stop()
-        # if self._session:
-        #    await self._session.close()
-        # self._session = None
         if self._api:
             await self._api.close()
 
@@ -55,16 +67,24 @@ class Govee(object):
         api_key: str,
         *,
         learning_storage: Optional[GoveeAbstractLearningStorage] = None,
+        session: Optional[aiohttp.ClientSession] = None,
     ):
-        """Init with an API_KEY and storage for learned values."""
+        """Init with an API_KEY and storage for learned values.
+
+        Pass an aiohttp session to share its connections, it stays open on close().
+        """
         _LOGGER.debug("govee_api_laggat v%s", VERSION)
         self._api_key = api_key
+        self._session = session
         self._api = None
         self._online = False
-        self.events = Events()
+        # created on first use, before Python 3.10 it binds to the current loop
+        self._online_event: Optional[asyncio.Event] = None
+        self.events = GoveeEvents()
         self._ble = GoveeBle(self)
         self._ignore_fields = self._get_empty_ignore_fields()
-        self._devices = {}
+        self._devices_dict: Dict[str, GoveeDevice] = {}
+        self._devices_list_cache: Optional[List[GoveeDevice]] = None
         self._config_offline_is_off = None
         self._learning_storage = learning_storage
         if not self._learning_storage:
@@ -78,9 +98,10 @@ class Govee(object):
         api_key: str,
         *,
         learning_storage: Optional[GoveeAbstractLearningStorage] = None,
+        session: Optional[aiohttp.ClientSession] = None,
     ):
         """Use create method if you want to use this Client without an async context manager."""
-        self = Govee(api_key, learning_storage=learning_storage)
+        self = Govee(api_key, learning_storage=learning_storage, session=session)
         await self.__aenter__()
         return self
 
@@ -90,7 +111,14 @@ class Govee(object):
 
     def _utcnow(self):
         """Helper method to get utc now as seconds."""
-        return datetime.timestamp(datetime.now())
+        return time.time()
+
+    @property
+    def rate_limit_snapshot(self) -> Optional[GoveeRateLimit]:
+        """All rate limit values read at once, None when the API is not connected."""
+        if not self._api:
+            return None
+        return self._api.rate_limit_snapshot
 
     @property
     def rate_limit_total(self):
@@ -118,30 +146,24 @@ class Govee(object):
         """Seconds until the rate limit will be reset."""
         if not self._api:
             return "API not connected."
-        return self._api._limit_reset - self._utcnow()
+        return self._api.rate_limit_reset_seconds
 
     @property
     def rate_limit_on(self):
-        """Remaining calls that trigger rate limiting.
+        """Remaining calls kept in reserve, the rate limiter paces requests to keep them.
 
         Defaults to 5, which means there is some room for other clients.
         """
         if not self._api:
             return "API not connected."
-        return self._api._rate_limit_on
+        return self._api.rate_limit_on
 
     @rate_limit_on.setter
     def rate_limit_on(self, val):
-        """Set the remaining calls that trigger rate limiting."""
+        """Set the remaining calls kept in reserve."""
         if not self._api:
             return "API not connected."
-        if val > self._api._limit:
-            raise GoveeError(
-                f"Rate limiter threshold {val} must be below {self._limit}"
-            )
-        if val < 1:
-            raise GoveeError(f"Rate limiter threshold {val} must be above 1")
-        self._api._rate_limit_on = val
+        self._api.rate_limit_on = val
 
     @property
     def config_offline_is_off(self):
@@ -159,24 +181,21 @@ class Govee(object):
         """
         self._config_offline_is_off = val
 
-    def _get_empty_ignore_fields(self):
+    @staticmethod
+    def _get_empty_ignore_fields():
         return {
             GoveeSource.API: [],
             GoveeSource.HISTORY: [],
             GoveeSource.BLE: [],
         }
 
-    def ignore_device_attributes(self, ignore_str: str):
-        """
-        Set a semicolon-separated list of properties to ignore from source API or HISTORY
-        (which means: remembered values on commands)
+    @staticmethod
+    def parse_ignore_device_attributes(ignore_str: str) -> Dict[GoveeSource, List[str]]:
+        """Parse the ignore string of ignore_device_attributes, no client needed.
 
-        Examples:
-        "API:online;HISTORY:power_state": ignore online from API, ignore power_state from HISTORY
-        "API:power_state": ignore power state from API
+        Raises GoveeError if the format is wrong.
         """
-        ignore_fields = self._get_empty_ignore_fields()
-        is_ignored = False
+        ignore_fields = Govee._get_empty_ignore_fields()
         if ignore_str:
             pair_list = ignore_str.split(";")
             for pair in pair_list:
@@ -184,36 +203,33 @@ class Govee(object):
                 if pair:
                     pair_details = pair.split(":")
                     if len(pair_details) != 2:
-                        raise GoveeError(
-                            "Format of '%s' is incorrect, use 'source:attribute;...'"
-                            % (pair,)
-                        )
+                        raise GoveeError(ERR_IGNORE_FORMAT, pair)
                     src, field = pair_details
                     src = src.lower()
                     field = field.lower()
-                    src_strings = {
-                        "api": GoveeSource.API,
-                        "history": GoveeSource.HISTORY,
-                        "ble": GoveeSource.BLE,
-                    }
-                    if src not in src_strings:
-                        raise GoveeError(
-                            "Cannot disable attributes for source '%s' as source must be in %s."
-                            % (
-                                src,
-                                repr(src_strings.keys),
-                            )
-                        )
+                    if src not in _IGNORE_SOURCES:
+                        raise GoveeError(ERR_IGNORE_SOURCE, src, list(_IGNORE_SOURCES))
                     if field not in GoveeDevice.__dataclass_fields__:
                         raise GoveeError(
-                            f"Cannot disable attribute '{field}' as GoveeDevice does not have such an attribute. "
-                            f"Available fields (not all work): {GoveeDevice.__dataclass_fields__!r}"
+                            ERR_IGNORE_FIELD,
+                            field,
+                            list(GoveeDevice.__dataclass_fields__),
                         )
-                    if src not in ignore_fields[src_strings[src]]:
-                        ignore_fields[src_strings[src]].append(field)
-                        is_ignored = True
-        self._ignore_fields = ignore_fields
-        if is_ignored:
+                    if field not in ignore_fields[_IGNORE_SOURCES[src]]:
+                        ignore_fields[_IGNORE_SOURCES[src]].append(field)
+        return ignore_fields
+
+    def ignore_device_attributes(self, ignore_str: str):
+        """
+        Set a semicolon-separated list of properties to ignore from source API or HISTORY
+        (which means: remembered values on commands)
+
+        Examples:
+        "API:online;HISTORY:power_state": ignore online from API, ignore power_state from HISTORY
+        "API:power_state": ignore power state from API
+        """
+        self._ignore_fields = self.parse_ignore_device_attributes(ignore_str)
+        if any(self._ignore_fields.values()):
             _LOGGER.warning(
                 "Set to ignore some attributes: %s", repr(self._ignore_fields)
             )
@@ -257,10 +273,27 @@ class Govee(object):
         device.timestamp = self._utcnow()
         return True
 
+    @property
+    def _devices(self) -> Dict[str, GoveeDevice]:
+        """Known devices by address, use _add_device() to add one."""
+        return self._devices_dict
+
+    @_devices.setter
+    def _devices(self, devices: Dict[str, GoveeDevice]):
+        self._devices_dict = devices
+        self._devices_list_cache = None
+
+    def _add_device(self, device: GoveeDevice):
+        """Add a device and invalidate the cached devices list."""
+        self._devices_dict[device.device] = device
+        self._devices_list_cache = None
+
     @property
     def devices(self) -> List[GoveeDevice]:
-        """Cached devices list."""
-        return [self._devices[dev] for dev in self._devices]
+        """Cached devices list, rebuilt only when devices are added."""
+        if self._devices_list_cache is None:
+            self._devices_list_cache = list(self._devices_dict.values())
+        return self._devices_list_cache
 
     def device(self, device: Union[str, GoveeDevice]) -> GoveeDevice:
         """Single device from cache."""
@@ -272,12 +305,28 @@ class Govee(object):
         """Last request was able to connect to the API."""
         return self._online
 
-    def _set_online(self, online: bool):
+    async def wait_online(self):
+        """Wait until a request was able to connect to the API."""
+        await self._get_online_event().wait()
+
+    def _get_online_event(self) -> asyncio.Event:
+        """Event set while online, created inside the running loop."""
+        if self._online_event is None:
+            self._online_event = asyncio.Event()
+            if self._online:
+                self._online_event.set()
+        return self._online_event
+
+    async def _set_online(self, online: bool):
         """Set the online state and fire an event on change."""
         if self._online != online:
             self._online = online
+            if online:
+                self._get_online_event().set()
+            else:
+                self._get_online_event().clear()
             # inform about state change
-            self.events.online(self._online)
+            await self.events.online.fire(self._online)
         if not online:
             # show all devices as offline
             for device in self.devices:
@@ -316,16 +365,16 @@ class Govee(object):
 
         returns: device_address, device_dto
         """
-        device_str = device
         if isinstance(device, GoveeDevice):
             device_str = device.device
-            if device_str not in self._devices:
+            if device_str not in self._devices_dict:
                 device = None  # disallow unknown devices
-        elif isinstance(device, str) and device_str in self._devices:
-            device = self._devices[device_str]
-        else:
-            raise GoveeDeviceNotFound(device_str)
-        return device_str, device
+            return device_str, device
+        # a single hash lookup on the dict, the devices property builds a list
+        found = self._devices_dict.get(device) if isinstance(device, str) else None
+        if found is None:
+            raise GoveeDeviceNotFound(device)
+        return device, found
 
     async def turn_on(self, device: Union[str, GoveeDevice]) -> Tuple[bool, str]:
         """Turn on a device, return success and error message."""
@@ -422,16 +471,45 @@ class Govee(object):
     async def get_states(self) -> List[GoveeDevice]:
         """Request states for all devices from API."""
         _LOGGER.debug("get_states")
+        devices = self.devices
         if self._api:
-            for device in self.devices:
-                _, err = await self._api._get_device_state(device)
-                if err:
+            # in one pass, devices without state or just controlled keep their history
+            need_api = []
+            for device in devices:
+                if device.retrievable and not self._api._get_lock_seconds(
+                    device.lock_get_until
+                ):
+                    need_api.append(device)
+                else:
+                    self._update_state(
+                        GoveeSource.HISTORY, device, "source", GoveeSource.HISTORY
+                    )
+                    device.error = None
+            # one failing device must not cancel the requests of the others
+            results = await asyncio.gather(
+                *[self._get_one_state(device) for device in need_api],
+                return_exceptions=True,
+            )
+            for device, result in zip(need_api, results):
+                if isinstance(result, Exception):
                     _LOGGER.warning(
                         "error getting state for device %s: %s",
                         device,
-                        err,
+                        repr(result),
                     )
-                    device.error = err
-                else:
-                    device.error = None
-        return self.devices
+                    device.error = repr(result)
+        return devices
+
+    async def _get_one_state(self, device: GoveeDevice):
+        """Request state for one device, concurrent requests are bounded."""
+        async with self._api._state_semaphore:
+            _, err = await self._api._get_device_state(device)
+        if err:
+            _LOGGER.warning(
+                "error getting state for device %s: %s",
+                device,
+                err,
+            )
+            device.error = err
+        else:
+            device.error = None
@@ -1,8 +1,23 @@
 """dto's used in the Govee API"""
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import List, Tuple
+from functools import lru_cache, reduce
+from operator import or_
+import sys
+from typing import Dict, Tuple
+
+# slotted dataclasses save the per instance __dict__, available since python 3.10
+DATACLASS_SLOTS = {"slots": True} if sys.version_info >= (3, 10) else {}
+
+# bit flags for commands in supportCmds
+_CMD_BITS = {"turn": 1, "brightness": 2, "color": 4, "colorTem": 8}
+
+
+@lru_cache(maxsize=64)
+def _caps_from_cmds(cmds: Tuple[str, ...]) -> int:
+    """Bit flags for supported commands, cached as many devices share a model."""
+    return reduce(or_, (_CMD_BITS.get(cmd, 0) for cmd in cmds), 0)
 
 
 class GoveeSource(Enum):
@@ -11,7 +26,7 @@ class GoveeSource(Enum):
     BLE = "ble"
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class GoveeDevice(object):
     """Govee Device DTO."""
 
@@ -20,11 +35,7 @@ class GoveeDevice(object):
     device_name: str  # custom name of that device configured by user
     controllable: bool  # is the device controllable?
     retrievable: bool  # do we get state from Govee API for this device?
-    support_cmds: List[str]  # list of all supported commands
-    support_turn: bool  # on/off is supported
-    support_brightness: bool  # brightness control is supported
-    support_color: bool  # color control is supported
-    support_color_tem: bool  # color temperature control is supported
+    support_cmds: Tuple[str, ...]  # all supported commands
     online: bool  # is the device online (connected to Govee API, and the library can connect the same API)
     power_state: bool  # On/Off state
     brightness: int  # brightness state
@@ -33,9 +44,70 @@ class GoveeDevice(object):
     timestamp: int  # timestamp of last change
     source: GoveeSource  # source of the last change, API or History
     error: str  # last and active error
-    lock_set_until: int  # we do not allow a set command until that time in seconds passed
-    lock_get_until: int  # we do not allow to get state until that time in seconds passed
+    lock_set_until: float  # we do not allow a set command until the monotonic clock passed that time
+    lock_get_until: float  # we do not allow to get state until the monotonic clock passed that time
     learned_set_brightness_max: int  # 100 or 255, defining how we need to set brightness for this device
     learned_get_brightness_max: int  # 100 or 255, defining how we need to read brightness state for this device
     before_set_brightness_turn_on: bool  # defines if we need to send a ON command before we can set brightness
     config_offline_is_off: bool  # if the device is offline, show it as off, or show it in the last known on/off state.
+    _cmd_mask: int = field(init=False, repr=False, compare=False)  # supported commands as bit flags
+    _api_params: Dict[str, str] = field(init=False, repr=False, compare=False)  # identifies the device in API calls, shared, never mutate
+
+    @classmethod
+    def from_api_json(cls, j, **state) -> "GoveeDevice":
+        """Create a device from a devices entry of the API, state given as keyword arguments."""
+        return cls(
+            device=j["device"],
+            model=j["model"],
+            device_name=j["deviceName"],
+            controllable=j["controllable"],
+            retrievable=j["retrievable"],
+            support_cmds=tuple(j["supportCmds"]),
+            **state,
+        )
+
+    def update_from_api_json(self, j):
+        """Update the device information from a devices entry of the API in place."""
+        self.device_name = j["deviceName"]
+        self.controllable = j["controllable"]
+        self.retrievable = j["retrievable"]
+        support_cmds = tuple(j["supportCmds"])
+        if support_cmds != self.support_cmds:
+            self.support_cmds = support_cmds
+            self._cmd_mask = _caps_from_cmds(support_cmds)
+
+    def __post_init__(self):
+        """Pack commands, build the API parameters once."""
+        self._api_params = {"device": self.device, "model": self.model}
+        self._cmd_mask = _caps_from_cmds(tuple(self.support_cmds))
+
+    @property
+    def support_turn(self) -> bool:
+        """on/off is supported"""
+        return bool(self._cmd_mask & _CMD_BITS["turn"])
+
+    @property
+    def support_brightness(self) -> bool:
+        """brightness control is supported"""
+        return bool(self._cmd_mask & _CMD_BITS["brightness"])
+
+    @property
+    def support_color(self) -> bool:
+        """color control is supported"""
+        return bool(self._cmd_mask & _CMD_BITS["color"])
+
+    @property
+    def support_color_tem(self) -> bool:
+        """color temperature control is supported"""
+        return bool(self._cmd_mask & _CMD_BITS["colorTem"])
+
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class GoveeRateLimit(object):
+    """Govee API rate limits at one point in time."""
+
+    total: int  # rate limit is counted down from this value
+    remaining: int  # remaining calls in the current window
+    reset: float  # UTC time in seconds when the rate limit will be reset
+    reset_seconds: float  # seconds until the rate limit will be reset
+    on: int  # remaining calls kept in reserve
@@ -1,9 +1,39 @@
 """Govee errors."""
 
+# error codes, raise GoveeError(code, *args) to format the message lazily
+ERR_IGNORE_FORMAT = "ignore_format"
+ERR_IGNORE_SOURCE = "ignore_source"
+ERR_IGNORE_FIELD = "ignore_field"
+ERR_RATE_LIMIT_ABOVE_LIMIT = "rate_limit_above_limit"
+ERR_RATE_LIMIT_BELOW_ONE = "rate_limit_below_one"
+
+_FORMATS = {
+    ERR_IGNORE_FORMAT: "Format of '%s' is incorrect, use 'source:attribute;...'",
+    ERR_IGNORE_SOURCE: "Cannot disable attributes for source '%s' as source must be in %r.",
+    ERR_IGNORE_FIELD: "Cannot disable attribute '%s' as GoveeDevice does not have such an attribute. "
+    "Available fields (not all work): %r",
+    ERR_RATE_LIMIT_ABOVE_LIMIT: "Rate limiter threshold %s must be below %s",
+    ERR_RATE_LIMIT_BELOW_ONE: "Rate limiter threshold %s must be above 1",
+}
+
 
 class GoveeError(Exception):
-    """Base Exception thrown from govee_api_laggat."""
+    """Base Exception thrown from govee_api_laggat.
+
+    Raised with an error code and its arguments, the message is only formatted
+    when the exception is converted to a string. Any other args behave like
+    a plain Exception.
+    """
+
+    __slots__ = ()
+
+    def __str__(self):
+        if self.args and self.args[0] in _FORMATS:
+            return _FORMATS[self.args[0]] % self.args[1:]
+        return super().__str__()
 
 
 class GoveeDeviceNotFound(GoveeError):
     """Device is unknown."""
+
+    __slots__ = ()
@@ -0,0 +1,56 @@
+"""Events fired by the Govee client."""
+
+import asyncio
+import inspect
+import logging
+from typing import Any, Callable, List
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class GoveeEvent(object):
+    """Event handlers, add with += and remove with -=.
+
+    Handlers may be plain functions or coroutine functions, coroutines
+    returned by handlers are awaited concurrently when the event fires.
+    """
+
+    __slots__ = ("_handlers",)
+
+    def __init__(self):
+        self._handlers: List[Callable[..., Any]] = []
+
+    def __iadd__(self, handler: Callable[..., Any]):
+        self._handlers.append(handler)
+        return self
+
+    def __isub__(self, handler: Callable[..., Any]):
+        self._handlers.remove(handler)
+        return self
+
+    def __len__(self):
+        return len(self._handlers)
+
+    async def fire(self, *args):
+        """Call all handlers with args and wait for async handlers."""
+        pending = []
+        for handler in list(self._handlers):
+            result = handler(*args)
+            if inspect.isawaitable(result):
+                pending.append(result)
+        if pending:
+            for result in await asyncio.gather(*pending, return_exceptions=True):
+                if isinstance(result, Exception):
+                    _LOGGER.warning("event handler failed: %s", repr(result))
+
+
+class GoveeEvents(object):
+    """Events of the Govee client."""
+
+    __slots__ = ("online", "new_device")
+
+    def __init__(self):
+        # fired with True/False when the API connection changes
+        self.online = GoveeEvent()
+        # fired with the GoveeDevice when a new device is discovered
+        self.new_device = GoveeEvent()
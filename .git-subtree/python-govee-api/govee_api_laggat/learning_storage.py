@@ -1,12 +1,15 @@
+import inspect
 import logging
 from abc import abstractmethod
 from dataclasses import dataclass
 from typing import Dict, Optional
 
+from govee_api_laggat.govee_dtos import DATACLASS_SLOTS
+
 _LOGGER = logging.getLogger(__name__)
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class GoveeLearnedInfo:
     set_brightness_max: Optional[int] = None
     get_brightness_max: Optional[int] = None
@@ -17,7 +20,11 @@ class GoveeLearnedInfo:
 
 
 class GoveeAbstractLearningStorage(object):
-    """Abstract class used for loading and storing of learning information."""
+    """Abstract class used for loading and storing of learning information.
+
+    read() and write() may be coroutines or plain methods, storages without
+    I/O can skip the coroutine.
+    """
 
     def __init__(self):
         self._learned_info = {}
@@ -27,7 +34,10 @@ class GoveeAbstractLearningStorage(object):
         """Do not override, this will cache the current state."""
         if not self._is_cached:
             # read into cache once
-            self._learned_info = await self.read()
+            learned_info = self.read()
+            if inspect.isawaitable(learned_info):
+                learned_info = await learned_info
+            self._learned_info = learned_info
             self._is_cached = True
         return self._learned_info
 
@@ -35,7 +45,9 @@ class GoveeAbstractLearningStorage(object):
         """Do not override, uses the write() to save learned information."""
         self._learned_info = learned_info
         self._is_cached = True
-        await self.write(self._learned_info)
+        result = self.write(self._learned_info)
+        if inspect.isawaitable(result):
+            await result
 
     @abstractmethod
     async def read(self) -> Dict[str, GoveeLearnedInfo]:
@@ -5,15 +5,19 @@ with open("README.md", "r") as fh:
 
 INSTALL_REQUIRES = [
     "aiohttp>=3.7.4.post0",
-    "bios>=0.1.2",
     "certifi>=2021.10.8",
-    "dacite>=1.8.0",
-    "events>=0.3",
     "pexpect>=4.8.0",
     "pygatt>=4.0.5",
     # , "govee_btled-1.0"
 ]
 
+EXTRAS_REQUIRE = {
+    # used by example/storage_example_yaml.py
+    "yaml": ["PyYAML>=5.4"],
+    # faster JSON (de)serialization of API payloads
+    "orjson": ["orjson>=3.6"],
+}
+
 setuptools.setup(
     name="govee_api_laggat",
     version="2023.11.1",
@@ -32,4 +36,5 @@ setuptools.setup(
     python_requires=">=3.7",
     # dependency_links=['https://codeload.github.com/chvolkmann/govee_btled/tarball/master#egg=govee_btled-1.0'],
     install_requires=INSTALL_REQUIRES,
+    extras_require=EXTRAS_REQUIRE,
 )
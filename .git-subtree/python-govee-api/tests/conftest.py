@@ -0,0 +1,88 @@
+"""Shared fixtures for the govee_api_laggat tests."""
+
+from collections import deque
+import logging
+from unittest.mock import MagicMock
+
+import pytest
+import pytest_asyncio
+
+from govee_api_laggat import Govee
+
+from .mockdata import (
+    API_KEY,
+    mock_aiohttp_get,
+    mock_aiohttp_put,
+    mock_aiohttp_responses_var,
+)
+
+
+@pytest.fixture(scope="session")
+def mock_aiohttp():
+    """Patch aiohttp requests once for the whole session."""
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("aiohttp.ClientSession.get", mock_aiohttp_get)
+        monkeypatch.setattr("aiohttp.ClientSession.put", mock_aiohttp_put)
+        yield
+
+
+@pytest.fixture(scope="session")
+def mock_logger_session():
+    """Patch the loggers once, building the Logger spec is expensive."""
+    mock = MagicMock(spec=logging.Logger)
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr("govee_api_laggat.govee_api_laggat._LOGGER", mock)
+        monkeypatch.setattr("govee_api_laggat.api._LOGGER", mock)
+        yield mock
+
+
+@pytest.fixture(autouse=True)
+def mock_logger(mock_logger_session):
+    """The session logger mock, without the calls of previous tests."""
+    mock_logger_session.reset_mock()
+    return mock_logger_session
+
+
+@pytest.fixture
+def mock_aiohttp_responses(mock_aiohttp):
+    """Responses for the mocked aiohttp requests of this test, in order."""
+    responses = deque()
+    token = mock_aiohttp_responses_var.set(responses)
+    yield responses
+    # tests share the session loop, do not leak our responses to the next one
+    mock_aiohttp_responses_var.reset(token)
+
+
+@pytest.fixture(autouse=True)
+def _assert_mocks_consumed(mock_aiohttp_responses):
+    """Every test has to use all the responses it mocked."""
+    yield
+    assert not mock_aiohttp_responses, (
+        f"Unconsumed mocks: {list(mock_aiohttp_responses)}"
+    )
+
+
+@pytest_asyncio.fixture(scope="session", loop_scope="session")
+async def govee_session(mock_aiohttp):
+    """One client for the session, creating the aiohttp session once."""
+    async with Govee(API_KEY) as govee:
+        yield govee
+
+
+@pytest_asyncio.fixture(loop_scope="session")
+async def govee(govee_session):
+    """A fresh client for this test, sharing the aiohttp session."""
+    async with Govee(API_KEY, session=govee_session._api._session) as govee:
+        yield govee
+
+
+def mock_never_lock_result(self, *args, **kwargs):
+    return 0
+
+
+@pytest.fixture
+def mock_never_lock(monkeypatch):
+    # function scoped, some tests rely on the real locking
+    monkeypatch.setattr(
+        "govee_api_laggat.api.GoveeApi._get_lock_seconds", mock_never_lock_result
+    )
@@ -1,146 +1,148 @@
+from contextvars import ContextVar
 import copy
+import json as jsonlib
+import sys
+from types import MappingProxyType
+from typing import Dict
 
 from govee_api_laggat import GoveeDevice, GoveeLearnedInfo, GoveeSource
 
 API_URL = "https://developer-api.govee.com"
 API_KEY = "SUPER_SECRET_KEY"
 # The maximum number of requests you're permitted to make per minute.
-RATELIMIT_TOTAL = "Rate-Limit-Total"
+RATELIMIT_TOTAL = sys.intern("Rate-Limit-Total")
 # The number of requests remaining in the current rate limit window.
-RATELIMIT_REMAINING = "Rate-Limit-Remaining"
+RATELIMIT_REMAINING = sys.intern("Rate-Limit-Remaining")
 # The time at which the current rate limit window resets in UTC epoch seconds.
-RATELIMIT_RESET = "Rate-Limit-Reset"
+RATELIMIT_RESET = sys.intern("Rate-Limit-Reset")
+# rate limit headers of a response without pressure, shared by all mock responses
+RATELIMIT_HEADERS_DEFAULT = {
+    RATELIMIT_TOTAL: 100,
+    RATELIMIT_REMAINING: 100,
+    RATELIMIT_RESET: 0,
+}
 
 # json results for lights
-JSON_DEVICE_H6163 = {
-    "device": "40:83:FF:FF:FF:FF:FF:FF",
-    "model": "H6163",
-    "deviceName": "H6131_FFFF",
-    "controllable": True,
-    "retrievable": True,
-    "supportCmds": ["turn", "brightness", "color", "colorTem"],
-}
-JSON_DEVICE_H6104 = {
-    "device": "99:F8:FF:FF:FF:FF:FF:FF",
-    "model": "H6104",
-    "deviceName": "H6104_22DC",
-    "controllable": True,
-    "retrievable": False,
-    "supportCmds": ["turn", "brightness", "color", "colorTem"],
-}
-JSON_DEVICES = copy.deepcopy(
+JSON_DEVICE_H6163 = MappingProxyType(
+    {
+        "device": "40:83:FF:FF:FF:FF:FF:FF",
+        "model": "H6163",
+        "deviceName": "H6131_FFFF",
+        "controllable": True,
+        "retrievable": True,
+        "supportCmds": ["turn", "brightness", "color", "colorTem"],
+    }
+)
+H6163_DEVICE_ID = JSON_DEVICE_H6163["device"]
+H6163_MODEL = JSON_DEVICE_H6163["model"]
+JSON_DEVICE_H6104 = MappingProxyType(
+    {
+        "device": "99:F8:FF:FF:FF:FF:FF:FF",
+        "model": "H6104",
+        "deviceName": "H6104_22DC",
+        "controllable": True,
+        "retrievable": False,
+        "supportCmds": ["turn", "brightness", "color", "colorTem"],
+    }
+)
+# shared read-only, MockAiohttpResponse hands out copies of the payload
+JSON_DEVICES = MappingProxyType(
     {"data": {"devices": [JSON_DEVICE_H6163, JSON_DEVICE_H6104]}}
 )
-JSON_DEVICES_EMPTY = {"data": {"devices": []}}
-JSON_OK_RESPONSE = {"code": 200, "data": {}, "message": "Success"}
+JSON_DEVICES_EMPTY = MappingProxyType({"data": {"devices": []}})
+# shared by all successful control responses, the api does not change it
+JSON_OK_RESPONSE = MappingProxyType({"code": 200, "data": {}, "message": "Success"})
 
-# light device (get new instance on every run to avoid the need for copy.deepcopy())
+# light devices, built once. All fields are immutable values, so a shallow copy
+# is an independent instance (get a new one on every run, tests change them)
+_DUMMY_DEVICE_H6163 = GoveeDevice.from_api_json(
+    JSON_DEVICE_H6163,
+    online=True,
+    power_state=True,
+    brightness=254,
+    color=(139, 0, 255),
+    color_temp=0,
+    timestamp=0,
+    source=GoveeSource.API,  # this device supports status
+    error=None,
+    lock_set_until=0,
+    lock_get_until=0,
+    learned_set_brightness_max=100,
+    learned_get_brightness_max=254,
+    before_set_brightness_turn_on=False,
+    config_offline_is_off=False,
+)
+_DUMMY_DEVICE_H6104 = GoveeDevice.from_api_json(
+    JSON_DEVICE_H6104,
+    online=True,
+    power_state=False,
+    brightness=0,
+    color=(0, 0, 0),
+    color_temp=0,
+    timestamp=0,
+    source=GoveeSource.HISTORY,
+    error=None,
+    lock_set_until=0,
+    lock_get_until=0,
+    learned_set_brightness_max=254,
+    learned_get_brightness_max=None,
+    before_set_brightness_turn_on=False,
+    config_offline_is_off=False,
+)
 
 
 def get_dummy_device_H6163() -> GoveeDevice:
-    return GoveeDevice(
-        device=JSON_DEVICE_H6163["device"],
-        model=JSON_DEVICE_H6163["model"],
-        device_name=JSON_DEVICE_H6163["deviceName"],
-        controllable=JSON_DEVICE_H6163["controllable"],
-        retrievable=JSON_DEVICE_H6163["retrievable"],
-        support_cmds=JSON_DEVICE_H6163["supportCmds"],
-        support_turn="turn" in JSON_DEVICE_H6163["supportCmds"],
-        support_brightness="brightness" in JSON_DEVICE_H6163["supportCmds"],
-        support_color="color" in JSON_DEVICE_H6163["supportCmds"],
-        support_color_tem="colorTem" in JSON_DEVICE_H6163["supportCmds"],
-        online=True,
-        power_state=True,
-        brightness=254,
-        color=(139, 0, 255),
-        color_temp=0,
-        timestamp=0,
-        source=GoveeSource.API,  # this device supports status
-        error=None,
-        lock_set_until=0,
-        lock_get_until=0,
-        learned_set_brightness_max=100,
-        learned_get_brightness_max=254,
-        before_set_brightness_turn_on=False,
-        config_offline_is_off=False,
-    )
+    return copy.copy(_DUMMY_DEVICE_H6163)
 
 
 def get_dummy_device_H6104() -> GoveeDevice:
-    return GoveeDevice(
-        device=JSON_DEVICE_H6104["device"],
-        model=JSON_DEVICE_H6104["model"],
-        device_name=JSON_DEVICE_H6104["deviceName"],
-        controllable=JSON_DEVICE_H6104["controllable"],
-        retrievable=JSON_DEVICE_H6104["retrievable"],
-        support_cmds=JSON_DEVICE_H6104["supportCmds"],
-        support_turn="turn" in JSON_DEVICE_H6104["supportCmds"],
-        support_brightness="brightness" in JSON_DEVICE_H6104["supportCmds"],
-        support_color="color" in JSON_DEVICE_H6104["supportCmds"],
-        support_color_tem="colorTem" in JSON_DEVICE_H6104["supportCmds"],
-        online=True,
-        power_state=False,
-        brightness=0,
-        color=(0, 0, 0),
-        color_temp=0,
-        timestamp=0,
-        source=GoveeSource.HISTORY,
-        error=None,
-        lock_set_until=0,
-        lock_get_until=0,
-        learned_set_brightness_max=254,
-        learned_get_brightness_max=None,
-        before_set_brightness_turn_on=False,
-        config_offline_is_off=False,
-    )
+    return copy.copy(_DUMMY_DEVICE_H6104)
 
 
-DUMMY_DEVICES = copy.deepcopy(
-    {
-        get_dummy_device_H6163().device: get_dummy_device_H6163(),
-        get_dummy_device_H6104().device: get_dummy_device_H6104(),
+def get_dummy_devices() -> Dict[str, GoveeDevice]:
+    return {
+        JSON_DEVICE_H6163["device"]: get_dummy_device_H6163(),
+        JSON_DEVICE_H6104["device"]: get_dummy_device_H6104(),
     }
-)
+
 
 # JSON results for light states
-JSON_DEVICE_STATE = copy.deepcopy(
-    {
+def JSON_DEVICE_STATE_WITH_BRIGHTNESS(brightness):
+    return {
         "data": {
             "device": JSON_DEVICE_H6163["device"],
             "model": JSON_DEVICE_H6163["model"],
             "properties": [
                 {"online": True},
                 {"powerState": "on"},
-                {"brightness": 254},
+                {"brightness": brightness},
                 {"color": {"r": 139, "b": 255, "g": 0}},
             ],
         },
         "message": "Success",
         "code": 200,
     }
-)
 
-# json offline state
-JSON_DEVICE_STATE_OFFLINE = {
-    "data": {
-        "device": JSON_DEVICE_H6163["device"],
-        "model": JSON_DEVICE_H6163["model"],
-        "properties": [
-            {"online": "false"},  # yes, govee returns string 'false'
-            {"powerState": "on"},
-            {"brightness": 254},
-            {"color": {"r": 139, "b": 255, "g": 0}},
-        ],
-    },
-    "message": "Success",
-    "code": 200,
-}
 
+JSON_DEVICE_STATE = MappingProxyType(JSON_DEVICE_STATE_WITH_BRIGHTNESS(254))
 
-def JSON_DEVICE_STATE_WITH_BRIGHTNESS(brightness):
-    val = copy.deepcopy(JSON_DEVICE_STATE)
-    val["data"]["properties"][2]["brightness"] = brightness
-    return val
+# json offline state
+JSON_DEVICE_STATE_OFFLINE = MappingProxyType(
+    {
+        "data": {
+            "device": JSON_DEVICE_H6163["device"],
+            "model": JSON_DEVICE_H6163["model"],
+            "properties": [
+                {"online": "false"},  # yes, govee returns string 'false'
+                {"powerState": "on"},
+                {"brightness": 254},
+                {"color": {"r": 139, "b": 255, "g": 0}},
+            ],
+        },
+        "message": "Success",
+        "code": 200,
+    }
+)
 
 
 # aiohttp mocking (monkeypatch)
@@ -150,28 +152,53 @@ class MockAiohttpResponse:
         *,
         status=200,
         json=None,
+        body=None,
         text=None,
-        headers={RATELIMIT_TOTAL: 100, RATELIMIT_REMAINING: 100, RATELIMIT_RESET: 0},
-        check_kwargs=lambda kwargs: True,
+        headers=RATELIMIT_HEADERS_DEFAULT,
+        expect_method=None,
+        expect_url=None,
+        expect_json=None,
+        expect_params=None,
+        expect_headers=None,
     ):
         self._status = status
-        self._json = json
+        # serialized once, every json() call returns a fresh copy of the payload.
+        # body sets the raw bytes instead, e.g. to send invalid JSON
+        self._json_bytes = (
+            body
+            if json is None
+            else jsonlib.dumps(json, default=dict).encode()
+        )
         self._text = text
         self._headers = headers
-        self._check_kwargs = check_kwargs
+        # request kwargs we expect, compared by equality
+        self._expected = tuple(
+            (key, value)
+            for key, value in (
+                ("method", expect_method),
+                ("url", expect_url),
+                ("json", expect_json),
+                ("params", expect_params),
+                ("headers", expect_headers),
+            )
+            if value is not None
+        )
 
     def check_kwargs(self, kwargs):
-        ok = self._check_kwargs(kwargs)
-        if not ok:
-            raise Exception(
-                f"kwargs '{kwargs}' not ok, checked by lambda: '{self._check_kwargs}'"
-            )
+        mismatches = [
+            f"  {key}: expected {value!r}, got {kwargs.get(key)!r}"
+            for key, value in self._expected
+            if kwargs.get(key) != value
+        ]
+        if mismatches:
+            raise AssertionError("unexpected request kwargs:\n" + "\n".join(mismatches))
 
     async def __aenter__(self):
         return self
 
     async def __aexit__(self, *error_info):
-        return self
+        # returning None lets exceptions raised inside "async with" propagate
+        return None
 
     @property
     def headers(self):
@@ -182,31 +209,76 @@ class MockAiohttpResponse:
         return self._status
 
     async def json(self):
-        return self._json
+        if self._json_bytes is None:
+            return None
+        return jsonlib.loads(self._json_bytes)
+
+    async def read(self):
+        return self._json_bytes or b""
 
     async def text(self):
         return self._text
 
 
-# learning infos
-LEARNED_NOTHING = {}
-LEARNED_S100_G254 = {
-    JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
-        get_brightness_max=254,
-        set_brightness_max=100,
+def ok_control(expect_json, **kwargs) -> MockAiohttpResponse:
+    """Successful response to a control request sending expect_json."""
+    return MockAiohttpResponse(
+        json=JSON_OK_RESPONSE,
+        expect_method="PUT",
+        expect_url=API_URL + "/v1/devices/control",
+        expect_json=expect_json,
+        **kwargs,
     )
-}
-LEARNED_TURN_BEFORE_BRIGHTNESS = {
-    JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
-        get_brightness_max=100,
-        set_brightness_max=100,
-        before_set_brightness_turn_on=True,
-    )
-}
-CONFIGURE_OFFLINE_IS_OFF = {
-    JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
-        get_brightness_max=254,
-        set_brightness_max=100,
-        config_offline_is_off=True,
-    )
-}
+
+
+# deque of responses returned by the patched aiohttp requests in order,
+# each test sets its own using the mock_aiohttp_responses fixture
+mock_aiohttp_responses_var = ContextVar("mock_aiohttp_responses")
+
+
+def _mock_aiohttp_request(method, kwargs):
+    mock_response = mock_aiohttp_responses_var.get().popleft()
+    mock_response.check_kwargs({"method": method, **kwargs})
+    return mock_response
+
+
+def mock_aiohttp_get(self, *args, **kwargs):
+    return _mock_aiohttp_request("GET", kwargs)
+
+
+def mock_aiohttp_put(self, *args, **kwargs):
+    return _mock_aiohttp_request("PUT", kwargs)
+
+
+# learning infos (learning changes them, get new instances on every run)
+def get_learned_nothing() -> Dict[str, GoveeLearnedInfo]:
+    return {}
+
+
+def get_learned_s100_g254() -> Dict[str, GoveeLearnedInfo]:
+    return {
+        JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
+            get_brightness_max=254,
+            set_brightness_max=100,
+        )
+    }
+
+
+def get_learned_turn_before_brightness() -> Dict[str, GoveeLearnedInfo]:
+    return {
+        JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
+            get_brightness_max=100,
+            set_brightness_max=100,
+            before_set_brightness_turn_on=True,
+        )
+    }
+
+
+def get_configure_offline_is_off() -> Dict[str, GoveeLearnedInfo]:
+    return {
+        JSON_DEVICE_H6163["device"]: GoveeLearnedInfo(
+            get_brightness_max=254,
+            set_brightness_max=100,
+            config_offline_is_off=True,
+        )
+    }
@@ -0,0 +1,62 @@
+"""Tests without the event loop, the async tests share the session loop."""
+import dataclasses
+
+from govee_api_laggat.api import _TokenBucket, _parse_rate_limit_headers
+from .mockdata import (
+    RATELIMIT_REMAINING,
+    RATELIMIT_RESET,
+    RATELIMIT_TOTAL,
+    get_dummy_device_H6163,
+)
+
+
+def test_rate_limiter_token_bucket():
+    bucket = _TokenBucket(2, 1.0)
+    # a full bucket allows a burst
+    assert bucket.reserve() == 0
+    assert bucket.reserve() == 0
+    # then requests are paced by the refill rate
+    assert 0.9 < bucket.reserve() <= 1.0
+    assert 1.9 < bucket.reserve() <= 2.0
+
+    # nothing available, the next token arrives when the window resets
+    bucket = _TokenBucket(2, 1.0)
+    bucket.recalibrate(0, 30)
+    assert 29.9 < bucket.reserve() <= 30.0
+    # available requests are spread over the window, the request still waiting
+    # for the window keeps its token
+    bucket.recalibrate(10, 5)
+    assert 1 <= bucket.tokens < 1.1
+    assert bucket.rate == 2.0
+    # a 429 response drops the burst, the next request waits for a refill
+    bucket.drain()
+    assert 0.4 < bucket.reserve() <= 0.5
+
+
+def test_rate_limiter_token_bucket_recalibrate_keeps_reservations():
+    bucket = _TokenBucket(2, 1.0)
+    # two requests use the burst, two more wait for their tokens
+    waits = [bucket.reserve() for _ in range(4)]
+    assert waits[:2] == [0, 0]
+    # a response reports the remaining budget while they wait
+    bucket.recalibrate(3, 3)
+    # the waiting requests still take their share, new ones queue behind them
+    assert 0.9 < bucket.reserve() <= 1.0
+
+
+def test_device_dataclass_helpers():
+    device = get_dummy_device_H6163()
+    assert "color=(139, 0, 255)" in repr(device)
+    assert dataclasses.asdict(device)["color"] == (139, 0, 255)
+    changed = dataclasses.replace(device, color=(1, 2, 3))
+    assert changed.color == (1, 2, 3)
+    assert changed._api_params == device._api_params
+    assert device.color == (139, 0, 255)
+
+
+def test_parse_rate_limit_headers():
+    assert _parse_rate_limit_headers(
+        {RATELIMIT_TOTAL: "100", RATELIMIT_REMAINING: "42", RATELIMIT_RESET: "1.5"}
+    ) == (100, 42, 1.5)
+    # all headers are needed
+    assert _parse_rate_limit_headers({RATELIMIT_TOTAL: "100"}) is None
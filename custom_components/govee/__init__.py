@@ -1,6 +1,7 @@
 """The Govee integration."""
 import asyncio
 import logging
+import time
 
 from govee_api_laggat import Govee
 import voluptuous as vol
@@ -10,6 +11,7 @@ from homeassistant.const import CONF_API_KEY
 from homeassistant.core import HomeAssistant
 from homeassistant.exceptions import PlatformNotReady
 
+from .compat import session_kwargs
 from .const import DOMAIN
 from .learning_storage import GoveeLearningStorage
 
@@ -18,27 +20,65 @@ CONFIG_SCHEMA = vol.Schema({DOMAIN: vol.Schema({})}, extra=vol.ALLOW_EXTRA)
 
 # supported platforms
 PLATFORMS = ["light"]
+# log API online/offline changes at most this often
+ONLINE_LOG_INTERVAL_SECONDS = 30
 
 
 def setup(hass, config):
     """This setup does nothing, we use the async setup."""
-    hass.states.set("govee.state", "setup called")
+    _LOGGER.debug("setup called")
     return True
 
 
 async def async_setup(hass: HomeAssistant, config: dict):
     """Set up the Govee component."""
-    hass.states.async_set("govee.state", "async_setup called")
+    _LOGGER.debug("async_setup called")
     hass.data[DOMAIN] = {}
     return True
 
 
-def is_online(online: bool):
-    """Log online/offline change."""
-    msg = "API is offline."
-    if online:
-        msg = "API is back online."
-    _LOGGER.warning(msg)
+def _is_online_logger():
+    """Log online/offline changes, at most once per interval when the API flaps.
+
+    A change within the interval is logged when the interval has passed, unless
+    the API went back to the state logged last. Returns the event handler and a
+    callable cancelling a deferred log.
+    """
+    logged_state = None
+    last_log = -ONLINE_LOG_INTERVAL_SECONDS
+    pending = None
+
+    def log_state(online: bool):
+        """Log online/offline change."""
+        nonlocal logged_state, last_log, pending
+        pending = None
+        if online == logged_state:
+            return
+        logged_state = online
+        last_log = time.monotonic()
+        msg = "API is offline."
+        if online:
+            msg = "API is back online."
+        _LOGGER.warning(msg)
+
+    def is_online(online: bool):
+        """Log now, or defer to the end of the interval."""
+        nonlocal pending
+        cancel()
+        wait = last_log + ONLINE_LOG_INTERVAL_SECONDS - time.monotonic()
+        if wait <= 0:
+            log_state(online)
+        else:
+            pending = asyncio.get_running_loop().call_later(wait, log_state, online)
+
+    def cancel():
+        """Drop a deferred log."""
+        nonlocal pending
+        if pending:
+            pending.cancel()
+            pending = None
+
+    return is_online, cancel
 
 
 async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
@@ -49,29 +89,32 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
     options = entry.options
     api_key = options.get(CONF_API_KEY, config.get(CONF_API_KEY, ""))
 
-    # Setup connection with devices/cloud
+    # Setup connection with devices/cloud, Home Assistant's shared keep-alive
+    # session skips the TLS handshake per request
     hub = await Govee.create(
-        api_key, learning_storage=GoveeLearningStorage(hass.config.config_dir)
+        api_key,
+        learning_storage=GoveeLearningStorage(hass.config.config_dir),
+        **session_kwargs(hass),
     )
     # keep reference for disposing
     hass.data[DOMAIN] = {}
     hass.data[DOMAIN]["hub"] = hub
 
     # inform when api is offline/online
+    is_online, cancel_online_log = _is_online_logger()
     hub.events.online += is_online
+    entry.async_on_unload(cancel_online_log)
 
     # Verify that passed in configuration works
     _, err = await hub.get_devices()
     if err:
         _LOGGER.warning("Could not connect to Govee API: %s", err)
         await hub.rate_limit_delay()
-        await async_unload_entry(hass, entry)
+        # platforms are not set up yet, only close the hub
+        await _async_close_hub(hass)
         raise PlatformNotReady()
 
-    for component in PLATFORMS:
-        hass.async_create_task(
-            hass.config_entries.async_forward_entry_setup(entry, component)
-        )
+    await hass.config_entries.async_forward_entry_setups(entry, PLATFORMS)
 
     return True
 
@@ -79,36 +122,15 @@ async def async_setup_entry(hass: HomeAssistant, entry: ConfigEntry):
 async def async_unload_entry(hass: HomeAssistant, entry: ConfigEntry):
     """Unload a config entry."""
 
-    unload_ok = all(
-        await asyncio.gather(
-            *[
-                _unload_component_entry(hass, entry, component)
-                for component in PLATFORMS
-            ]
-        )
-    )
+    unload_ok = await hass.config_entries.async_unload_platforms(entry, PLATFORMS)
 
     if unload_ok:
-        hub = hass.data[DOMAIN].pop("hub")
-        await hub.close()
+        await _async_close_hub(hass)
 
     return unload_ok
 
 
-def _unload_component_entry(
-    hass: HomeAssistant, entry: ConfigEntry, component: str
-) -> bool:
-    """Unload an entry for a specific component."""
-    success = False
-    try:
-        success = hass.config_entries.async_forward_entry_unload(entry, component)
-    except ValueError:
-        # probably ValueError: Config entry was never loaded!
-        return success
-    except Exception as ex:
-        _LOGGER.warning(
-            "Continuing on exception when unloading %s component's entry: %s",
-            component,
-            ex,
-        )
-        return success
+async def _async_close_hub(hass: HomeAssistant):
+    """Close the hub, the shared aiohttp session stays open."""
+    hub = hass.data[DOMAIN].pop("hub")
+    await hub.close()
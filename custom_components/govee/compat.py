@@ -0,0 +1,56 @@
+"""Bridge the published govee-api-laggat release and newer library features."""
+import inspect
+from types import SimpleNamespace
+
+from govee_api_laggat import Govee, GoveeNoLearningStorage
+
+from homeassistant.core import HomeAssistant
+from homeassistant.config_entries import ConfigEntry
+from homeassistant.helpers.aiohttp_client import async_get_clientsession
+from homeassistant.helpers.update_coordinator import DataUpdateCoordinator
+
+# released library versions open their own aiohttp session
+_SUPPORTS_SESSION = "session" in inspect.signature(Govee.__init__).parameters
+# Home Assistant 2024.11 added the config_entry argument of coordinators
+_COORDINATOR_SUPPORTS_ENTRY = (
+    "config_entry" in inspect.signature(DataUpdateCoordinator.__init__).parameters
+)
+
+
+def session_kwargs(hass: HomeAssistant) -> dict:
+    """Share Home Assistant's aiohttp session if the library accepts one."""
+    if not _SUPPORTS_SESSION:
+        return {}
+    return {"session": async_get_clientsession(hass)}
+
+
+def coordinator_kwargs(config_entry: ConfigEntry) -> dict:
+    """Tie a coordinator to its config entry if Home Assistant accepts one."""
+    if not _COORDINATOR_SUPPORTS_ENTRY:
+        return {}
+    return {"config_entry": config_entry}
+
+
+async def async_parse_ignore_device_attributes(ignore_str: str):
+    """Parse the ignore_device_attributes string, raises GoveeError if invalid."""
+    if hasattr(Govee, "parse_ignore_device_attributes"):
+        return Govee.parse_ignore_device_attributes(ignore_str)
+    # released library: parse on a hub connected without API key
+    async with Govee("", learning_storage=GoveeNoLearningStorage()) as hub:
+        return hub.ignore_device_attributes(ignore_str)
+
+
+def rate_limit_snapshot(hub: Govee):
+    """All rate limit values at once, None if the API is not connected."""
+    if hasattr(type(hub), "rate_limit_snapshot"):
+        return hub.rate_limit_snapshot
+    # released library: no snapshot, read the single properties instead
+    if not isinstance(hub.rate_limit_total, int):
+        return None
+    return SimpleNamespace(
+        total=hub.rate_limit_total,
+        remaining=hub.rate_limit_remaining,
+        reset=hub.rate_limit_reset,
+        reset_seconds=hub.rate_limit_reset_seconds,
+        on=hub.rate_limit_on,
+    )
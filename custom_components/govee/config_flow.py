@@ -1,6 +1,11 @@
 """Config flow for Govee integration."""
 
+from collections import OrderedDict
+from functools import lru_cache
+import hashlib
 import logging
+import time
+from typing import Tuple
 
 from govee_api_laggat import Govee, GoveeNoLearningStorage, GoveeError
 
@@ -10,6 +15,7 @@ from homeassistant.const import CONF_API_KEY, CONF_DELAY
 from homeassistant.core import callback
 import voluptuous as vol
 
+from .compat import async_parse_ignore_device_attributes, session_kwargs
 from .const import (
     CONF_DISABLE_ATTRIBUTE_UPDATES,
     CONF_OFFLINE_IS_OFF,
@@ -19,6 +25,69 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
+# successfully validated API keys (by SHA-256) and when, skips repeated cloud calls
+_VALIDATION_CACHE: "OrderedDict[str, float]" = OrderedDict()
+_VALIDATION_CACHE_MAX = 128
+_VALIDATION_CACHE_TTL_SECONDS = 300
+
+
+def _api_key_hash(api_key: str) -> str:
+    """Hash the API key, we do not keep keys in memory longer than needed."""
+    return hashlib.sha256(api_key.encode()).hexdigest()
+
+
+def _invalidate(api_key: str):
+    """Forget a successful validation of this API key."""
+    _VALIDATION_CACHE.pop(_api_key_hash(api_key), None)
+
+
+def _log_expected_error(msg: str, ex: Exception):
+    """Log an error caused by user input, the traceback only when debugging."""
+    _LOGGER.warning(msg, ex, exc_info=_LOGGER.isEnabledFor(logging.DEBUG))
+
+
+# options form fields after the API key in order: marker, key, validator
+_OPTIONS_FIELDS = (
+    # to config flow
+    (vol.Optional, CONF_DELAY, cv.positive_int),
+    # to options flow
+    (vol.Required, CONF_USE_ASSUMED_STATE, cv.boolean),
+    (vol.Required, CONF_OFFLINE_IS_OFF, cv.boolean),
+    # TODO: validator doesn't work, change to list?
+    (vol.Optional, CONF_DISABLE_ATTRIBUTE_UPDATES, cv.string),
+)
+
+
+# config flow form, it has no defaults from an entry
+_USER_SCHEMA = vol.Schema(
+    {
+        vol.Required(CONF_API_KEY): cv.string,
+        vol.Optional(CONF_DELAY, default=10): cv.positive_int,
+    }
+)
+
+
+@lru_cache(maxsize=8)
+def _options_fields(defaults: Tuple) -> dict:
+    """Build the options fields for defaults in field order, never mutate.
+
+    Cached, the defaults only change when the options are saved.
+    """
+    return {
+        marker(key, default=default): validator
+        for (marker, key, validator), default in zip(_OPTIONS_FIELDS, defaults)
+    }
+
+
+def _options_schema(api_key: str, defaults: Tuple) -> vol.Schema:
+    """Build the options schema, the API key is not kept in the cache."""
+    return vol.Schema(
+        {
+            vol.Required(CONF_API_KEY, default=api_key): cv.string,
+            **_options_fields(defaults),
+        }
+    )
+
 
 async def validate_api_key(hass: core.HomeAssistant, user_input):
     """Validate the user input allows us to connect.
@@ -26,11 +95,30 @@ async def validate_api_key(hass: core.HomeAssistant, user_input):
     Return info that you want to store in the config entry.
     """
     api_key = user_input[CONF_API_KEY]
-    async with Govee(api_key, learning_storage=GoveeNoLearningStorage()) as hub:
+    key_hash = _api_key_hash(api_key)
+    validated = _VALIDATION_CACHE.get(key_hash)
+    if (
+        validated is not None
+        and time.monotonic() - validated < _VALIDATION_CACHE_TTL_SECONDS
+    ):
+        _VALIDATION_CACHE.move_to_end(key_hash)
+        return user_input
+
+    # Home Assistant's shared session, its connections are already established
+    async with Govee(
+        api_key,
+        learning_storage=GoveeNoLearningStorage(),
+        **session_kwargs(hass),
+    ) as hub:
         _, error = await hub.get_devices()
         if error:
             raise CannotConnect(error)
 
+    _VALIDATION_CACHE[key_hash] = time.monotonic()
+    _VALIDATION_CACHE.move_to_end(key_hash)
+    if len(_VALIDATION_CACHE) > _VALIDATION_CACHE_MAX:
+        _VALIDATION_CACHE.popitem(last=False)
+
     # Return info that you want to store in the config entry.
     return user_input
 
@@ -42,10 +130,8 @@ async def validate_disabled_attribute_updates(hass: core.HomeAssistant, user_inp
     """
     disable_str = user_input[CONF_DISABLE_ATTRIBUTE_UPDATES]
     if disable_str:
-        # we have something to check, connect without API key
-        async with Govee("", learning_storage=GoveeNoLearningStorage()) as hub:
-            # this will throw an GoveeError if something fails
-            hub.ignore_device_attributes(disable_str)
+        # this will throw an GoveeError if something fails
+        await async_parse_ignore_device_attributes(disable_str)
 
     # Return info that you want to store in the config entry.
     return user_input
@@ -66,10 +152,10 @@ class GoveeFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
                 user_input = await validate_api_key(self.hass, user_input)
 
             except CannotConnect as conn_ex:
-                _LOGGER.exception("Cannot connect: %s", conn_ex)
+                _log_expected_error("Cannot connect: %s", conn_ex)
                 errors[CONF_API_KEY] = "cannot_connect"
             except GoveeError as govee_ex:
-                _LOGGER.exception("Govee library error: %s", govee_ex)
+                _log_expected_error("Govee library error: %s", govee_ex)
                 errors["base"] = "govee_ex"
             except Exception as ex:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception: %s", ex)
@@ -80,12 +166,7 @@ class GoveeFlowHandler(config_entries.ConfigFlow, domain=DOMAIN):
 
         return self.async_show_form(
             step_id="user",
-            data_schema=vol.Schema(
-                {
-                    vol.Required(CONF_API_KEY): cv.string,
-                    vol.Optional(CONF_DELAY, default=10): cv.positive_int,
-                }
-            ),
+            data_schema=_USER_SCHEMA,
             errors=errors,
         )
 
@@ -116,6 +197,9 @@ class GoveeOptionsFlowHandler(config_entries.OptionsFlow):
         old_api_key = self.config_entry.options.get(
             CONF_API_KEY, self.config_entry.data.get(CONF_API_KEY, "")
         )
+        old_disable_str = self.config_entry.options.get(
+            CONF_DISABLE_ATTRIBUTE_UPDATES, ""
+        )
 
         errors = {}
         if user_input is not None:
@@ -123,32 +207,35 @@ class GoveeOptionsFlowHandler(config_entries.OptionsFlow):
             try:
                 api_key = user_input[CONF_API_KEY]
                 if old_api_key != api_key:
+                    # the replaced key may have been revoked
+                    _invalidate(old_api_key)
                     user_input = await validate_api_key(self.hass, user_input)
 
             except CannotConnect as conn_ex:
-                _LOGGER.exception("Cannot connect: %s", conn_ex)
+                _log_expected_error("Cannot connect: %s", conn_ex)
                 errors[CONF_API_KEY] = "cannot_connect"
             except GoveeError as govee_ex:
-                _LOGGER.exception("Govee library error: %s", govee_ex)
+                _log_expected_error("Govee library error: %s", govee_ex)
                 errors["base"] = "govee_ex"
             except Exception as ex:  # pylint: disable=broad-except
                 _LOGGER.exception("Unexpected exception: %s", ex)
                 errors["base"] = "unknown"
 
-            # check validate_disabled_attribute_updates
+            # check validate_disabled_attribute_updates, if it changed
+            disable_str = user_input.get(CONF_DISABLE_ATTRIBUTE_UPDATES, "")
             try:
-                user_input = await validate_disabled_attribute_updates(
-                    self.hass, user_input
-                )
+                if old_disable_str != disable_str:
+                    user_input = await validate_disabled_attribute_updates(
+                        self.hass, user_input
+                    )
 
                 # apply settings to the running instance
                 if DOMAIN in self.hass.data and "hub" in self.hass.data[DOMAIN]:
                     hub = self.hass.data[DOMAIN]["hub"]
                     if hub:
-                        disable_str = user_input[CONF_DISABLE_ATTRIBUTE_UPDATES]
                         hub.ignore_device_attributes(disable_str)
             except GoveeError as govee_ex:
-                _LOGGER.exception(
+                _log_expected_error(
                     "Wrong input format for validate_disabled_attribute_updates: %s",
                     govee_ex,
                 )
@@ -163,36 +250,15 @@ class GoveeOptionsFlowHandler(config_entries.OptionsFlow):
                 # for later - extend with options you don't want in config but option flow
                 # return await self.async_step_options_2()
 
-        options_schema = vol.Schema(
-            {
-                # to config flow
-                vol.Required(
-                    CONF_API_KEY,
-                    default=old_api_key,
-                ): cv.string,
-                vol.Optional(
-                    CONF_DELAY,
-                    default=self.config_entry.options.get(
-                        CONF_DELAY, self.config_entry.data.get(CONF_DELAY, 10)
-                    ),
-                ): cv.positive_int,
-                # to options flow
-                vol.Required(
-                    CONF_USE_ASSUMED_STATE,
-                    default=self.config_entry.options.get(CONF_USE_ASSUMED_STATE, True),
-                ): cv.boolean,
-                vol.Required(
-                    CONF_OFFLINE_IS_OFF,
-                    default=self.config_entry.options.get(CONF_OFFLINE_IS_OFF, False),
-                ): cv.boolean,
-                # TODO: validator doesn't work, change to list?
-                vol.Optional(
-                    CONF_DISABLE_ATTRIBUTE_UPDATES,
-                    default=self.config_entry.options.get(
-                        CONF_DISABLE_ATTRIBUTE_UPDATES, ""
-                    ),
-                ): cv.string,
-            },
+        options = self.config_entry.options
+        options_schema = _options_schema(
+            old_api_key,
+            (
+                options.get(CONF_DELAY, self.config_entry.data.get(CONF_DELAY, 10)),
+                options.get(CONF_USE_ASSUMED_STATE, True),
+                options.get(CONF_OFFLINE_IS_OFF, False),
+                options.get(CONF_DISABLE_ATTRIBUTE_UPDATES, ""),
+            ),
         )
 
         return self.async_show_form(
@@ -1,7 +1,10 @@
 """Govee platform."""
 
+import asyncio
 from datetime import timedelta, datetime
+from functools import lru_cache, partial
 import logging
+import sys
 
 from govee_api_laggat import Govee, GoveeDevice, GoveeError
 from govee_api_laggat.govee_dtos import GoveeSource
@@ -16,9 +19,15 @@ from homeassistant.components.light import (
     LightEntity,
 )
 from homeassistant.const import CONF_DELAY
-from homeassistant.helpers.update_coordinator import DataUpdateCoordinator, UpdateFailed
+from homeassistant.core import callback
+from homeassistant.helpers.update_coordinator import (
+    CoordinatorEntity,
+    DataUpdateCoordinator,
+    UpdateFailed,
+)
 from homeassistant.util import color
 
+from .compat import coordinator_kwargs, rate_limit_snapshot
 from .const import (
     DOMAIN,
     CONF_OFFLINE_IS_OFF,
@@ -30,6 +39,30 @@ from .const import (
 
 _LOGGER = logging.getLogger(__name__)
 
+# coldest and warmest color_temp the lights support
+_MIN_MIREDS = color.color_temperature_kelvin_to_mired(COLOR_TEMP_KELVIN_MAX)
+_MAX_MIREDS = color.color_temperature_kelvin_to_mired(COLOR_TEMP_KELVIN_MIN)
+# the rate limit attributes change on every request, publish them less often
+RATE_LIMIT_UPDATE_INTERVAL = timedelta(seconds=60)
+
+
+@lru_cache(maxsize=256)
+def _rgb_to_hs(red: int, green: int, blue: int):
+    """Convert RGB to HS, cached as lights mostly report the same colors."""
+    return color.color_RGB_to_hs(red, green, blue)
+
+
+@lru_cache(maxsize=256)
+def _hs_to_rgb(hue: float, saturation: float):
+    """Convert HS to RGB, cached as scenes set the same colors again."""
+    return color.color_hs_to_RGB(hue, saturation)
+
+
+@lru_cache(maxsize=8)
+def _timestamp_isoformat(timestamp: float) -> str:
+    """Format a timestamp, cached as all lights show the same rate limit reset."""
+    return datetime.fromtimestamp(timestamp).isoformat()
+
 
 async def async_setup_entry(hass, entry, async_add_entities):
     """Set up the Govee Light platform."""
@@ -45,37 +78,83 @@ async def async_setup_entry(hass, entry, async_add_entities):
     coordinator = GoveeDataUpdateCoordinator(
         hass, _LOGGER, update_interval=update_interval, config_entry=entry
     )
-    # Fetch initial data so we have data when entities subscribe
-    hub.events.new_device += lambda device: add_entity(
-        async_add_entities, hub, entry, coordinator, device
+    rate_limit_coordinator = DataUpdateCoordinator(
+        hass,
+        _LOGGER,
+        name=f"{DOMAIN} rate limit",
+        update_interval=RATE_LIMIT_UPDATE_INTERVAL,
+        update_method=partial(_async_rate_limit_attributes, hub),
+        **coordinator_kwargs(entry),
     )
+    # Fetch initial data so we have data when entities subscribe
     await coordinator.async_refresh()
+    await rate_limit_coordinator.async_refresh()
+
+    # Add known devices at once, the new_device event adds later discoveries.
+    # No await between both, so no device is added twice or missed.
+    entities = [
+        GoveeLightEntity(
+            hub, entry.title, coordinator, rate_limit_coordinator, device
+        )
+        for device in hub.devices
+    ]
+    new_device_handler = partial(
+        add_entity,
+        async_add_entities,
+        hub,
+        entry,
+        coordinator,
+        rate_limit_coordinator,
+    )
+    hub.events.new_device += new_device_handler
+
+    def remove_new_device_handler():
+        hub.events.new_device -= new_device_handler
 
-    # Add devices
-    for device in hub.devices:
-        add_entity(async_add_entities, hub, entry, coordinator, device)
-    # async_add_entities(
-    #     [
-    #         GoveeLightEntity(hub, entry.title, coordinator, device)
-    #         for device in hub.devices
-    #     ],
-    #     update_before_add=False,
-    # )
+    entry.async_on_unload(remove_new_device_handler)
+    async_add_entities(entities, update_before_add=False)
 
 
-def add_entity(async_add_entities, hub, entry, coordinator, device):
+def add_entity(
+    async_add_entities, hub, entry, coordinator, rate_limit_coordinator, device
+):
     async_add_entities(
-        [GoveeLightEntity(hub, entry.title, coordinator, device)],
+        [
+            GoveeLightEntity(
+                hub, entry.title, coordinator, rate_limit_coordinator, device
+            )
+        ],
         update_before_add=False,
     )
 
 
+async def _async_rate_limit_attributes(hub: Govee):
+    """Rate limiting information on Govee API, shown by all lights."""
+    rate_limit = rate_limit_snapshot(hub)
+    if rate_limit is None:
+        # API not connected, nothing to show
+        return {}
+    return {
+        "rate_limit_total": rate_limit.total,
+        "rate_limit_remaining": rate_limit.remaining,
+        "rate_limit_reset_seconds": round(rate_limit.reset_seconds, 2),
+        "rate_limit_reset": _timestamp_isoformat(rate_limit.reset),
+        "rate_limit_on": rate_limit.on,
+    }
+
+
 class GoveeDataUpdateCoordinator(DataUpdateCoordinator):
     """Device state update handler."""
 
     def __init__(self, hass, logger, update_interval=None, *, config_entry):
         """Initialize global data updater."""
         self._config_entry = config_entry
+        self._connection_check = None
+        self._read_options()
+        # entities read the options on every state write, refresh them on change only
+        config_entry.async_on_unload(
+            config_entry.add_update_listener(self._async_options_updated)
+        )
 
         super().__init__(
             hass,
@@ -83,50 +162,64 @@ class GoveeDataUpdateCoordinator(DataUpdateCoordinator):
             name=DOMAIN,
             update_interval=update_interval,
             update_method=self._async_update,
+            **coordinator_kwargs(config_entry),
         )
 
+    def _read_options(self):
+        """Take the options of the config entry."""
+        options = self._config_entry.options
+        self._use_assumed_state = options.get(CONF_USE_ASSUMED_STATE, True)
+        self._config_offline_is_off = options.get(CONF_OFFLINE_IS_OFF, False)
+
+    async def _async_options_updated(self, hass, config_entry):
+        """Options changed in the options flow."""
+        self._read_options()
+
     @property
     def use_assumed_state(self):
         """Use assumed states."""
-        return self._config_entry.options.get(CONF_USE_ASSUMED_STATE, True)
+        return self._use_assumed_state
 
     @property
     def config_offline_is_off(self):
         """Interpret offline led's as off (global config)."""
-        return self._config_entry.options.get(CONF_OFFLINE_IS_OFF, False)
+        return self._config_offline_is_off
 
     async def _async_update(self):
         """Fetch data."""
         self.logger.debug("_async_update")
-        if "govee" not in self.hass.data:
+        hub = (self.hass.data.get(DOMAIN) or {}).get("hub")
+        if hub is None:
             raise UpdateFailed("Govee instance not available")
         try:
-            hub = self.hass.data[DOMAIN]["hub"]
-
             if not hub.online:
-                # when offline, check connection, this will set hub.online
-                await hub.check_connection()
-
-            if hub.online:
-                # set global options to library
-                if self.config_offline_is_off:
-                    hub.config_offline_is_off = True
-                else:
-                    hub.config_offline_is_off = None  # allow override in learning info
-
-                # govee will change this to a single request in 2021
-                device_states = await hub.get_states()
-                for device in device_states:
-                    if device.error:
-                        self.logger.warning(
-                            "update failed for %s: %s", device.device, device.error
-                        )
-                return device_states
+                # when offline, check connection in the background, this will set
+                # hub.online for the next update. Keep the last known states.
+                # The task belongs to the entry, unloading it cancels the check.
+                if self._connection_check is None or self._connection_check.done():
+                    entry = self._config_entry
+                    self._connection_check = entry.async_create_background_task(
+                        self.hass, hub.check_connection(), f"{DOMAIN} connection check"
+                    )
+                return self.data or []
+
+            # set global options to library
+            # None allows override in learning info
+            hub.config_offline_is_off = True if self._config_offline_is_off else None
+
+            # one request per retrievable device, the library sends them concurrently
+            device_states = await hub.get_states()
+            for device in device_states:
+                if device.error:
+                    self.logger.warning(
+                        "update failed for %s: %s", device.device, device.error
+                    )
+            return device_states
         except GoveeError as ex:
             raise UpdateFailed(f"Exception on getting states: {ex}") from ex
 
 
-class GoveeLightEntity(LightEntity):
+class GoveeLightEntity(CoordinatorEntity, LightEntity):
     """Representation of a stateful light entity."""
 
     def __init__(
@@ -134,13 +227,39 @@ class GoveeLightEntity(LightEntity):
         hub: Govee,
         title: str,
         coordinator: GoveeDataUpdateCoordinator,
+        rate_limit_coordinator: DataUpdateCoordinator,
         device: GoveeDevice,
     ):
         """Init a Govee light strip."""
+        super().__init__(coordinator)
+        self._rate_limit_coordinator = rate_limit_coordinator
         self._hub = hub
         self._title = title
-        self._coordinator = coordinator
         self._device = device
+        # the device capabilities and identity do not change, compute them once
+        support_flags = 0
+        if device.support_brightness:
+            support_flags |= SUPPORT_BRIGHTNESS
+        if device.support_color:
+            support_flags |= SUPPORT_COLOR
+        if device.support_color_tem:
+            support_flags |= SUPPORT_COLOR_TEMP
+        self._attr_supported_features = support_flags
+        self._attr_unique_id = sys.intern(f"govee_{title}_{device.device}")
+        self._attr_device_info = {
+            "identifiers": {(DOMAIN, self._attr_unique_id)},
+            "name": device.device_name,
+            "manufacturer": "Govee",
+            "model": device.model,
+            "via_device": (DOMAIN, "Govee API (cloud)"),
+        }
+        self._static_attributes = {"manufacturer": "Govee", "model": device.model}
+        self._attr_min_mireds = _MIN_MIREDS
+        self._attr_max_mireds = _MAX_MIREDS
+        # device state last written, the first coordinator update always writes
+        self._state_fingerprint = None
+        self._rate_limit_fingerprint = None
+        self._update_attributes()
 
     @property
     def entity_registry_enabled_default(self):
@@ -148,62 +267,112 @@ class GoveeLightEntity(LightEntity):
         return True
 
     async def async_added_to_hass(self):
-        """Connect to dispatcher listening for entity data notifications."""
-        self._coordinator.async_add_listener(self.async_write_ha_state)
+        """Also write the state when the rate limit attributes change."""
+        await super().async_added_to_hass()
+        self._rate_limit_fingerprint = self._get_rate_limit_fingerprint()
+        self.async_on_remove(
+            self._rate_limit_coordinator.async_add_listener(
+                self._handle_rate_limit_update
+            )
+        )
+
+    def _get_rate_limit_fingerprint(self):
+        """Rate limit attributes, without the countdown derived from the reset."""
+        rate_limit = dict(self._rate_limit_coordinator.data or {})
+        rate_limit.pop("rate_limit_reset_seconds", None)
+        return rate_limit
+
+    @callback
+    def _handle_rate_limit_update(self):
+        """Write the state only if the rate limit attributes changed."""
+        fingerprint = self._get_rate_limit_fingerprint()
+        if fingerprint == self._rate_limit_fingerprint:
+            return
+        self._rate_limit_fingerprint = fingerprint
+        self.async_write_ha_state()
+
+    def _update_attributes(self):
+        """Take the state of the device into the entity attributes."""
+        device = self._device
+        self._attr_is_on = device.power_state
+        self._attr_available = device.online
+        rgb = device.color
+        self._attr_rgb_color = rgb
+        self._attr_hs_color = _rgb_to_hs(*rgb)
+        # govee is reporting 0 to 254 - home assistant uses 1 to 255
+        self._attr_brightness = device.brightness + 1
+        self._attr_color_temp = (
+            color.color_temperature_kelvin_to_mired(device.color_temp)
+            if device.color_temp
+            else None
+        )
+
+    @callback
+    def _handle_coordinator_update(self):
+        """Refresh the attributes once per coordinator update, if they changed."""
+        device = self._device
+        fingerprint = (
+            device.power_state,
+            device.color,
+            device.brightness,
+            device.color_temp,
+            device.online,
+            device.source,
+        )
+        if fingerprint == self._state_fingerprint:
+            return
+        self._state_fingerprint = fingerprint
+        self._update_attributes()
+        self.async_write_ha_state()
 
     @property
     def _state(self):
         """Lights internal state."""
         return self._device  # self._hub.state(self._device)
 
-    @property
-    def supported_features(self):
-        """Flag supported features."""
-        support_flags = 0
-        if self._device.support_brightness:
-            support_flags |= SUPPORT_BRIGHTNESS
-        if self._device.support_color:
-            support_flags |= SUPPORT_COLOR
-        if self._device.support_color_tem:
-            support_flags |= SUPPORT_COLOR_TEMP
-        return support_flags
-
     async def async_turn_on(self, **kwargs):
         """Turn device on."""
         _LOGGER.debug(
             "async_turn_on for Govee light %s, kwargs: %s", self._device.device, kwargs
         )
-        err = None
-
-        just_turn_on = True
+        commands = []
         if ATTR_HS_COLOR in kwargs:
             hs_color = kwargs.pop(ATTR_HS_COLOR)
-            just_turn_on = False
-            col = color.color_hs_to_RGB(hs_color[0], hs_color[1])
-            _, err = await self._hub.set_color(self._device, col)
+            col = _hs_to_rgb(hs_color[0], hs_color[1])
+            commands.append(self._hub.set_color(self._device, col))
         if ATTR_BRIGHTNESS in kwargs:
             brightness = kwargs.pop(ATTR_BRIGHTNESS)
-            just_turn_on = False
             bright_set = brightness - 1
-            _, err = await self._hub.set_brightness(self._device, bright_set)
+            commands.append(self._hub.set_brightness(self._device, bright_set))
         if ATTR_COLOR_TEMP in kwargs:
             color_temp = kwargs.pop(ATTR_COLOR_TEMP)
-            just_turn_on = False
-            color_temp_kelvin = color.color_temperature_mired_to_kelvin(color_temp)
-            if color_temp_kelvin > COLOR_TEMP_KELVIN_MAX:
-                color_temp_kelvin = COLOR_TEMP_KELVIN_MAX
-            elif color_temp_kelvin < COLOR_TEMP_KELVIN_MIN:
-                color_temp_kelvin = COLOR_TEMP_KELVIN_MIN
-            _, err = await self._hub.set_color_temp(self._device, color_temp_kelvin)
+            color_temp_kelvin = min(
+                max(
+                    color.color_temperature_mired_to_kelvin(color_temp),
+                    COLOR_TEMP_KELVIN_MIN,
+                ),
+                COLOR_TEMP_KELVIN_MAX,
+            )
+            commands.append(self._hub.set_color_temp(self._device, color_temp_kelvin))
 
         # if there is no known specific command - turn on
-        if just_turn_on:
-            _, err = await self._hub.turn_on(self._device)
+        if not commands:
+            commands.append(self._hub.turn_on(self._device))
+        # send concurrently, the library keeps the order for one device
+        results = await asyncio.gather(*commands, return_exceptions=True)
+        err = None
+        for result in results:
+            if isinstance(result, Exception):
+                err = repr(result)
+            elif result[1]:
+                _, err = result
         # debug log unknown commands
         if kwargs:
             _LOGGER.debug(
                 "async_turn_on doesnt know how to handle kwargs: %s", repr(kwargs)
             )
+        # the library keeps the sent values, show them right away
+        self._handle_coordinator_update()
         # warn on any error
         if err:
             _LOGGER.warning(
@@ -217,38 +386,18 @@ class GoveeLightEntity(LightEntity):
         """Turn device off."""
         _LOGGER.debug("async_turn_off for Govee light %s", self._device.device)
         await self._hub.turn_off(self._device)
-
-    @property
-    def unique_id(self):
-        """Return the unique ID."""
-        return f"govee_{self._title}_{self._device.device}"
+        self._handle_coordinator_update()
 
     @property
     def device_id(self):
         """Return the ID."""
-        return self.unique_id
+        return self._attr_unique_id
 
     @property
     def name(self):
         """Return the name."""
         return self._device.device_name
 
-    @property
-    def device_info(self):
-        """Return the device info."""
-        return {
-            "identifiers": {(DOMAIN, self.device_id)},
-            "name": self.name,
-            "manufacturer": "Govee",
-            "model": self._device.model,
-            "via_device": (DOMAIN, "Govee API (cloud)"),
-        }
-
-    @property
-    def is_on(self):
-        """Return true if device is on."""
-        return self._device.power_state
-
     @property
     def assumed_state(self):
         """
@@ -257,69 +406,22 @@ class GoveeLightEntity(LightEntity):
         This can be disabled in options.
         """
         return (
-            self._coordinator.use_assumed_state
+            self.coordinator.use_assumed_state
             and self._device.source == GoveeSource.HISTORY
         )
 
     @property
     def available(self):
         """Return if light is available."""
-        return self._device.online
-
-    @property
-    def hs_color(self):
-        """Return the hs color value."""
-        return color.color_RGB_to_hs(
-            self._device.color[0],
-            self._device.color[1],
-            self._device.color[2],
-        )
-
-    @property
-    def rgb_color(self):
-        """Return the rgb color value."""
-        return [
-            self._device.color[0],
-            self._device.color[1],
-            self._device.color[2],
-        ]
-
-    @property
-    def brightness(self):
-        """Return the brightness value."""
-        # govee is reporting 0 to 254 - home assistant uses 1 to 255
-        return self._device.brightness + 1
-
-    @property
-    def color_temp(self):
-        """Return the color_temp of the light."""
-        if not self._device.color_temp:
-            return None
-        return color.color_temperature_kelvin_to_mired(self._device.color_temp)
-
-    @property
-    def min_mireds(self):
-        """Return the coldest color_temp that this light supports."""
-        return color.color_temperature_kelvin_to_mired(COLOR_TEMP_KELVIN_MAX)
-
-    @property
-    def max_mireds(self):
-        """Return the warmest color_temp that this light supports."""
-        return color.color_temperature_kelvin_to_mired(COLOR_TEMP_KELVIN_MIN)
+        # CoordinatorEntity reports the coordinator state, we report the device
+        return self._attr_available
 
     @property
     def extra_state_attributes(self):
         """Return the device state attributes."""
         return {
             # rate limiting information on Govee API
-            "rate_limit_total": self._hub.rate_limit_total,
-            "rate_limit_remaining": self._hub.rate_limit_remaining,
-            "rate_limit_reset_seconds": round(self._hub.rate_limit_reset_seconds, 2),
-            "rate_limit_reset": datetime.fromtimestamp(
-                self._hub.rate_limit_reset
-            ).isoformat(),
-            "rate_limit_on": self._hub.rate_limit_on,
+            **(self._rate_limit_coordinator.data or {}),
             # general information
-            "manufacturer": "Govee",
-            "model": self._device.model,
+            **self._static_attributes,
         }
@@ -1,5 +1,8 @@
 """Test the Govee config flow."""
+import pytest
+
 from homeassistant import config_entries, setup
+from custom_components.govee import config_flow
 from custom_components.govee.const import DOMAIN
 from homeassistant.const import CONF_API_KEY, CONF_DELAY
 from homeassistant.core import HomeAssistant
@@ -8,6 +11,12 @@ from homeassistant.core import HomeAssistant
 from unittest.mock import patch
 
 
+@pytest.fixture(autouse=True)
+def clear_validation_cache():
+    """Each test validates its API key against the mocked cloud."""
+    config_flow._VALIDATION_CACHE.clear()
+
+
 async def test_form(hass: HomeAssistant):
     """Test we get the form."""
     await setup.async_setup_component(hass, "persistent_notification", {})